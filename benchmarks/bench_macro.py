@@ -0,0 +1,206 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pathfind.grid import Grid, MazeGrid, RandomSurface
+from pathfind.algorithm import (
+    Wave, Dijkstra, AStar, JumpPointSearch, BidirectionalDijkstra, BidirectionalAStar, DStarLite,
+    )
+from pathfind.hierarchy import Hierarchy
+from pathfind import batch
+
+
+ALGORITHMS = [Wave, Dijkstra, AStar, JumpPointSearch, BidirectionalDijkstra, BidirectionalAStar, DStarLite]
+# Находят кратчайший путь с учётом цены диагонали.
+OPTIMAL = [Wave, Dijkstra, AStar, JumpPointSearch, BidirectionalDijkstra, BidirectionalAStar, DStarLite]
+
+_mazes = {}
+
+
+def maze(side):
+    if side not in _mazes:
+        random.seed(side)
+        _mazes[side] = MazeGrid(side, side)
+    return _mazes[side]
+
+
+@pytest.mark.parametrize('side', [10, 25, 50])
+@pytest.mark.parametrize('algorithm', ALGORITHMS, ids=lambda algorithm: algorithm.__name__)
+def bench_solve(bench, algorithm, side):
+    grid = maze(side)
+    bench(lambda: algorithm(grid).solve())
+
+
+@pytest.mark.parametrize('factory', [MazeGrid, RandomSurface], ids=lambda factory: factory.__name__)
+@pytest.mark.parametrize('seed', range(5))
+def test_optimal_agree(factory, seed):
+    random.seed(seed)
+    grid = factory(15, 15)
+    lengths = {}
+    for algorithm in OPTIMAL:
+        alg = algorithm(grid)
+        alg.solve()
+        lengths[algorithm.__name__] = alg.path_length
+    assert len(set(lengths.values())) == 1, lengths
+
+
+def test_concurrent_searches():
+    # Поиски с разными концами на одной карте из потоков дают то же, что и по очереди.
+    random.seed(0)
+    grid = RandomSurface(30, 30)
+    free = [index for index in range(30 * 30) if not grid.obstacles[index]]
+    tasks = [
+        (algorithm, random.choice(free), random.choice(free)) for algorithm in OPTIMAL for _ in range(4)
+        ]
+
+    def solve(task):
+        algorithm, start, finish = task
+        alg = algorithm(grid, start=start, finish=finish)
+        alg.solve()
+        return alg.path_length, alg.path
+
+    expected = list(map(solve, tasks))
+    with ThreadPoolExecutor(4) as executor:
+        assert list(executor.map(solve, tasks)) == expected
+
+
+def test_solve_many_in_process():
+    # workers=1: те же ответы, что и по одному, а карта вызывающего и глобал воркера не остаются грязными.
+    random.seed(1)
+    grid = RandomSurface(20, 20)
+    free = [grid.pos(index) for index in range(20 * 20) if not grid.obstacles[index]]
+    pairs = [(random.choice(free), random.choice(free)) for _ in range(10)]
+    endpoints = grid.start_index, grid.finish_index
+    expected = []
+    for start, finish in pairs:
+        alg = AStar(grid, start=start, finish=finish)
+        alg.solve()
+        expected.append((alg.statistic, alg.path if alg.path_length != float('inf') else []))
+    assert batch.solve_many(grid, pairs, workers=1) == expected
+    assert (grid.start_index, grid.finish_index) == endpoints
+    assert batch._grid is None
+
+
+@pytest.mark.parametrize('algorithm', [Dijkstra, AStar, DStarLite], ids=lambda algorithm: algorithm.__name__)
+def test_nodes_show_last_search(algorithm):
+    # Node и grid.colors() показывают состояние последнего поиска, а не пустое общее.
+    random.seed(0)
+    grid = RandomSurface(20, 20)
+    alg = algorithm(grid)
+    alg.solve()
+    g, h, parent, visited = alg.search.state()
+    for index in range(20 * 20):
+        node = grid.node(index)
+        assert node.g == g[index] and node.h == h[index] and node.is_visited == visited[index]
+    assert (grid.colors() == alg.colors()).all()
+    # Отпущенное состояние читается до следующего поиска и потом снова идёт в дело.
+    search = alg.search
+    del alg
+    assert grid.node(grid.finish_index).is_visited
+    assert algorithm(grid).search is search
+
+
+def test_dstar_lite_explicit_endpoints():
+    # Заданные в конструкторе концы переживают update_cells, сетка на них не влияет.
+    grid = Grid(10, 10)
+    alg = DStarLite(grid, start=(2, 2), finish=(7, 3))
+    alg.solve()
+    changed = [(5, 2), (5, 3)]
+    for pos in changed:
+        grid[pos].is_obstacle = True
+    alg.update_cells(changed)
+    alg.solve()
+    fresh = Dijkstra(grid, start=(2, 2), finish=(7, 3))
+    fresh.solve()
+    assert alg.path_length == fresh.path_length
+    assert alg.path[0] == (7, 3) and alg.path[-1] == (2, 2)
+
+
+def _toggle(grid, rng, count):
+    """Переключает count случайных клеток, кроме старта и финиша, возвращает их (x, y)."""
+    changed = []
+    for _ in range(count):
+        index = rng.randrange(grid.w * grid.h)
+        if index in (grid.start_index, grid.finish_index):
+            continue
+        grid.set_obstacle(index, not grid.obstacles[index])
+        changed.append(grid.pos(index))
+    return changed
+
+
+def _shortest(grid, start=None, finish=None):
+    alg = Dijkstra(grid, start=start, finish=finish)
+    alg.solve()
+    return alg.path_length
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_dstar_lite_replans(seed):
+    # После правок, переноса старта и финиша D* Lite находит то же, что новый поиск.
+    random.seed(seed)
+    rng = random.Random(seed)
+    grid = RandomSurface(20, 20)
+    alg = DStarLite(grid)
+    alg.solve()
+    assert alg.path_length == _shortest(grid)
+    for _ in range(5):
+        alg.update_cells(_toggle(grid, rng, 8))
+        alg.solve()
+        assert alg.path_length == _shortest(grid)
+    free = [index for index in range(grid.w * grid.h) if not grid.obstacles[index]]
+    grid.start_index = rng.choice(free)
+    alg.update_cells(_toggle(grid, rng, 4))
+    alg.solve()
+    assert alg.path_length == _shortest(grid)
+    grid.finish_index = rng.choice(free)
+    alg.update_cells()
+    alg.solve()
+    assert alg.path_length == _shortest(grid)
+    if alg.path_length != float('inf'):
+        assert alg.path[0] == grid.pos(grid.finish_index) and alg.path[-1] == grid.pos(grid.start_index)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_dstar_lite_explicit_endpoints_replan(seed):
+    # Свои концы не следуют за сеткой, новые передаются в update_cells.
+    random.seed(seed)
+    rng = random.Random(seed)
+    grid = RandomSurface(20, 20)
+    free = [index for index in range(grid.w * grid.h) if not grid.obstacles[index]]
+    start, finish = rng.choice(free), rng.choice(free)
+    alg = DStarLite(grid, start=start, finish=finish)
+    alg.solve()
+    grid.start_index, grid.finish_index = rng.choice(free), rng.choice(free)
+    alg.update_cells(_toggle(grid, rng, 8))
+    alg.solve()
+    assert (alg.start, alg.finish) == (start, finish)
+    assert alg.path_length == _shortest(grid, start, finish)
+    start = rng.choice([index for index in free if not grid.obstacles[index]])
+    alg.update_cells(start=grid.pos(start))
+    alg.solve()
+    assert alg.path_length == _shortest(grid, start, finish)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_hierarchy_update_matches_rebuild(seed):
+    # Частичный пересчёт кластеров даёт тот же абстрактный граф и пути, что и полная сборка.
+    random.seed(seed)
+    rng = random.Random(seed)
+    grid = RandomSurface(40, 40)
+    hierarchy = Hierarchy(grid, cluster=8)
+    for _ in range(3):
+        changed = _toggle(grid, rng, 10)
+        assert not hierarchy.is_valid
+        hierarchy.update_cells(changed)
+        assert hierarchy.is_valid
+        fresh = Hierarchy(grid, cluster=8)
+        assert {node: sorted(edges) for node, edges in hierarchy.graph.items()} == \
+            {node: sorted(edges) for node, edges in fresh.graph.items()}
+        free = [index for index in range(grid.w * grid.h) if not grid.obstacles[index]]
+        for _ in range(5):
+            start, finish = grid.pos(rng.choice(free)), grid.pos(rng.choice(free))
+            assert hierarchy.find_path(start, finish) == fresh.find_path(start, finish)
+            # HPA* почти оптимален и находит путь тогда же, когда и точный поиск.
+            length = _shortest(grid, start, finish)
+            assert (hierarchy.find_path(start, finish)[0] == float('inf')) == (length == float('inf'))
@@ -0,0 +1,110 @@
+import random
+import tracemalloc
+
+import pytest
+
+import numpy as np
+
+from pathfind import mapfile
+from pathfind.frames import FrameRecorder
+from pathfind.grid import CompactGrid, Grid, MazeGrid, RandomSurface
+from pathfind.landmarks import Landmarks
+
+
+@pytest.fixture(scope='module')
+def grid():
+    grid = Grid(100, 100)
+    for node in grid:
+        node.is_obstacle = random.random() < 0.3
+    return grid
+
+
+def bench_node_neighbors(bench, grid):
+    nodes = list(grid)
+    bench(lambda: [node.neighbors() for node in nodes])
+
+
+def bench_grid_reset(bench, grid):
+    bench(lambda: [grid.reset() for _ in range(1000)])
+
+
+def bench_grid_image(bench, grid):
+    bench(grid.image)
+
+
+@pytest.mark.parametrize('side', [10, 25])
+def bench_maze_generation(bench, side):
+    bench(MazeGrid, side, side)
+
+
+@pytest.mark.parametrize('side', [20, 40])
+def bench_surface_generation(bench, side):
+    bench(RandomSurface, side, side)
+
+
+@pytest.fixture(scope='module')
+def map_files(tmp_path_factory):
+    # 1000 x 1000, в формате Moving AI и в .pfm.
+    directory = tmp_path_factory.mktemp('maps')
+    rng = random.Random(0)
+    rows = [''.join('@' if rng.random() < 0.3 else '.' for _ in range(1000)) for _ in range(1000)]
+    movingai = directory / 'random.map'
+    movingai.write_text('type octile\nheight 1000\nwidth 1000\nmap\n' + '\n'.join(rows) + '\n')
+    pfm = directory / 'random.pfm'
+    mapfile.save(mapfile.load_movingai(str(movingai), CompactGrid), str(pfm))
+    return {'map': str(movingai), 'pfm': str(pfm)}
+
+
+@pytest.mark.parametrize('extension', ['map', 'pfm'])
+def bench_map_load(bench, map_files, extension):
+    bench(mapfile.open_map, map_files[extension], CompactGrid)
+
+
+def test_map_round_trip(map_files):
+    grid = mapfile.load_movingai(map_files['map'], CompactGrid)
+    loaded = mapfile.load(map_files['pfm'], CompactGrid)
+    assert (loaded.obstacles == grid.obstacles).all()
+    assert (loaded.start_index, loaded.finish_index) == (grid.start_index, grid.finish_index)
+
+
+@pytest.mark.parametrize('algorithm', ['backtracker', 'wilson', 'eller'])
+@pytest.mark.parametrize('size', [(1, 6), (6, 1), (5, 4)])
+def test_maze_connected(algorithm, size):
+    # Идеальный лабиринт: все комнаты и проходы в одной компоненте, включая коридоры шириной 1.
+    grid = MazeGrid(*size, seed=0, algorithm=algorithm)
+    w, h = size
+    assert (~grid.obstacles).sum() == 2 * w * h - 1
+    assert grid.components().max() == 0
+
+
+def test_frame_recorder_thin():
+    # Каждый второй кадр остаётся тем же, запись меньше, и распакованный кадр в памяти один.
+    rng = np.random.default_rng(0)
+    colors = np.zeros((120, 200, 3), dtype=np.uint8)
+    frames = []
+    recorder = FrameRecorder(keyframe=50)
+    for i in range(300):
+        colors[rng.integers(120, size=20), rng.integers(200, size=20)] = rng.integers(256, size=(20, 3))
+        frames.append((colors.copy(), [(i % 200, 0), (0, i % 120)]))
+        recorder.append(*frames[-1])
+    before = recorder.nbytes
+    tracemalloc.start()
+    recorder.thin(2)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert len(recorder) == 150
+    assert recorder.nbytes < before
+    assert peak < before + 6 * colors.nbytes
+    for (colors, path), (expected, expected_path) in zip(recorder, frames[::2]):
+        assert (colors == expected).all() and path == expected_path
+
+
+def test_landmarks_empty():
+    with pytest.raises(ValueError):
+        Landmarks(CompactGrid(5, 5), count=0)
+    # Без свободных клеток ориентиров нет, и ALT остаётся с оценкой 0.
+    grid = CompactGrid(5, 5)
+    grid.obstacles[:] = True
+    landmarks = Landmarks(grid)
+    assert landmarks.table.shape == (25, 0)
+    assert landmarks.lower_bound(0, 24) == 0
@@ -0,0 +1,62 @@
+"""Сравнивает прогон бенчмарков с базовой линией.
+
+    python -m pytest benchmarks                                   # пишет results/bench.json
+    python benchmarks/compare_baseline.py                         # сравнивает с benchmarks/baseline.json
+    python benchmarks/compare_baseline.py --threshold 0.5         # допускает замедление до 50%
+    python benchmarks/compare_baseline.py --update                # делает текущий прогон базовой линией
+
+Код возврата 1, если хоть один бенчмарк медленнее базы больше, чем на threshold.
+Времена зависят от машины, базу стоит перезаписывать на той, где идёт сравнение.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def compare(current: dict[str, float], baseline: dict[str, float], threshold: float):
+    """Возвращает строки отчёта и список регрессий."""
+    lines, regressions = [], []
+    lines.append(f'{"benchmark":<45} {"base, ms":>10} {"now, ms":>10} {"change":>8}')
+    for name in sorted(baseline.keys() | current.keys()):
+        if name not in current or name not in baseline:
+            lines.append(f'{name:<45} {"only in " + ("baseline" if name in baseline else "run"):>30}')
+            continue
+        change = current[name] / baseline[name] - 1
+        mark = ''
+        if change > threshold:
+            regressions.append(name)
+            mark = '  REGRESSION'
+        lines.append(f'{name:<45} {baseline[name] * 1000:>10.3f} {current[name] * 1000:>10.3f} {change:>+8.0%}{mark}')
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('current', nargs='?', default='results/bench.json')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25, help='допустимое замедление, доля')
+    parser.add_argument('--update', action='store_true', help='записать current в baseline')
+    args = parser.parse_args()
+
+    if args.update:
+        shutil.copyfile(args.current, args.baseline)
+        return 0
+    with open(args.current) as f:
+        current = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    lines, regressions = compare(current, baseline, args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print(f'\n{len(regressions)} regressed by more than {args.threshold:.0%}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import json
+import os
+import random
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Лучшее время каждого бенчмарка за сессию, имя - как у теста в pytest.
+_results: dict[str, float] = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption('--bench-out', default='results/bench.json',
+                     help='куда записать времена этого прогона')
+    parser.addoption('--bench-repeat', type=int, default=5,
+                     help='сколько раз повторять каждый замер, берётся лучший')
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(0)
+
+
+@pytest.fixture
+def bench(request):
+    """bench(func, *args) - вызывает func repeat раз и запоминает лучшее время, возвращает результат."""
+    repeat = request.config.getoption('--bench-repeat')
+
+    def run(func, *args, setup=None):
+        best = float('inf')
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            begin = time.perf_counter()
+            result = func(*args)
+            best = min(best, time.perf_counter() - begin)
+        _results[request.node.name] = best
+        return result
+
+    return run
+
+
+def pytest_sessionfinish(session):
+    if not _results:
+        return
+    filename = session.config.getoption('--bench-out')
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    with open(filename, mode='w') as f:
+        json.dump(dict(sorted(_results.items())), f, indent=1)
@@ -1,59 +1,108 @@
+import math
+
+import numpy as np
 from PIL import Image, ImageDraw
 from pathfind.algorithm import Wave, Dijkstra, AStar
 from pathfind.grid import Grid, MazeGrid, RandomSurface
+from pathfind.frames import FrameRecorder, writer_for
 
 
 class ImageMixin:
-    def __init__(self, grid: Grid, resolution) -> None:
+    def __init__(self, grid: Grid, resolution, every=1, max_frames=None) -> None:
         super().__init__(grid)
         self.resolution = self.w, self.h = resolution
         self.rect_w, self.rect_h = self.w // grid.w, self.h // grid.h
-        self.frames: list[tuple[tuple[tuple[tuple[int, int, int]]], list[tuple[int, int]]]] = []  # ЧТО ЭТО?
+        # Цвета клеток и путь на каждом every-м шаге, целиком только ключевые кадры.
+        # max_frames: когда кадров становится больше, каждый второй выкидывается, а шаг записи
+        # удваивается - длинный поиск не тратит время на кадры, которые всё равно не попадут в файл.
+        self.frames = FrameRecorder()
+        self.every = every
+        self.max_frames = max_frames
+        self._start_recording()
+
+    def _start_recording(self):
+        self.frames.clear()
+        self._step = 0
+        self._step_every = self.every
+        self._recorded = -1
+
+    def _record(self):
+        self.frames.append(self.colors(), self.path)
+        self._recorded = self._step
+        if self.max_frames and len(self.frames) > self.max_frames:
+            self.frames.thin(2)
+            self._step_every *= 2
 
     def __iter__(self):
-        self.frames = []
+        self._start_recording()
         return super().__iter__()
 
     def __next__(self):
-        super().__next__()
-        self.frames.append((self.grid.image(), self.path.copy()))
+        try:
+            res = super().__next__()
+        except StopIteration:
+            # Последний шаг пишем всегда, на нём найденный путь.
+            if self._recorded != self._step - 1:
+                self._step -= 1
+                self._record()
+                self._step += 1
+            raise
+        if self._step % self._step_every == 0:
+            self._record()
+        self._step += 1
+        return res
 
     def _draw_path(self, im, path):
-        draw = ImageDraw.Draw(im, mode='RGB')
+        draw = ImageDraw.Draw(im)
         offset_x, offset_y = self.rect_w // 2, self.rect_h // 2
         path = [(offset_x + self.rect_w * x, offset_y + self.rect_h * y) for (x, y) in path]
-        draw.line(path, fill='black', width=2)
-
-    def _draw_grid(self, im, grid):
-        draw = ImageDraw.Draw(im, mode='RGB')
-        grid_w, grid_h = len(grid[0]), len(grid)
-        for y in range(grid_h):
-            for x in range(grid_w):
-                p1 = x * self.rect_w, y * self.rect_h
-                p2 = (x + 1) * self.rect_w, (y + 1) * self.rect_h
-                draw.rectangle((p1, p2), fill=grid[y][x])
-
-    def _image_from_frame(self, frame):
+        # В палитровом кадре чёрный - последний индекс.
+        draw.line(path, fill=255 if im.mode == 'P' else 'black', width=2)
+
+    def _draw_grid(self, grid: np.ndarray, palette=False):
+        # Каждая клетка - блок rect_h x rect_w пикселей, одной операцией; остаток справа и снизу чёрный.
+        if palette:
+            # Палитру считаем по клеткам, а не по пикселям: так в разы быстрее, чем квантовать кадр целиком.
+            cells = Image.fromarray(grid, mode='RGB').quantize(255)
+            colors = cells.getpalette()[:255 * 3]
+            colors += [0] * (256 * 3 - len(colors))
+            grid = np.asarray(cells)
+            pixels = np.full((self.h, self.w), 255, dtype=np.uint8)
+        else:
+            pixels = np.zeros((self.h, self.w, 3), dtype=np.uint8)
+        blocks = grid.repeat(self.rect_h, axis=0).repeat(self.rect_w, axis=1)
+        pixels[:blocks.shape[0], :blocks.shape[1]] = blocks
+        if palette:
+            im = Image.fromarray(pixels, mode='P')
+            im.putpalette(colors)
+            return im
+        return Image.fromarray(pixels, mode='RGB')
+
+    def _image_from_frame(self, frame, palette=False):
         grid, path = frame
-        im = Image.new('RGB', self.resolution)
-        self._draw_grid(im, grid)
+        im = self._draw_grid(grid, palette)
+        # Путь поверх клеток.
         self._draw_path(im, path)
         return im
 
-    def images(self):
-        return [self._image_from_frame(frame) for frame in self.frames]
+    def images(self, every=1, max_frames=None, palette=False):
+        """Кадры по одному, каждый every-й; max_frames сам подбирает every. Последний кадр всегда есть.
+        palette=True - кадры в режиме 'P' (до 255 цветов клеток и чёрный), для GIF."""
+        total = len(self.frames)
+        if max_frames:
+            every = max(every, math.ceil(total / max_frames))
+        for i, frame in enumerate(self.frames):
+            if i % every == 0 or i == total - 1:
+                yield self._image_from_frame(frame, palette)
+
+    def save(self, name: str, duration=150, every=1, max_frames=None):
+        """GIF или APNG (.png, .apng) по расширению, кадры пишутся в файл по одному."""
+        with writer_for(name, duration) as writer:
+            for image in self.images(every, max_frames, palette=name.lower().endswith('.gif')):
+                writer.write(image)
 
-    def save_as_gif(self, name: str, duration=150):
-        images = self.images()
-        first_image = images[0]
-        first_image.save(
-            name,
-            format='GIF',
-            append_images=images,
-            save_all=True,
-            duration=duration,
-            loop=0
-            )
+    def save_as_gif(self, name: str, duration=150, every=1, max_frames=None):
+        self.save(name, duration, every, max_frames)
 
 
 class ImageWave(ImageMixin, Wave):
@@ -92,7 +141,6 @@ def is_valid_grid(grid):
 def surface():
     resolution = (int(1280 / 2), int(720 / 2))
     grid = Grid.load_file('src/grid.txt')
-    grid.reset()
     animate('surface', grid, resolution)
 
 
@@ -0,0 +1,127 @@
+import random
+import time
+
+from pathfind.grid import Grid, MazeGrid, RandomSurface
+from pathfind.algorithm import Dijkstra, AStar, JumpPointSearch, BidirectionalAStar, DStarLite
+from pathfind.batch import solve_many
+from pathfind.landmarks import Landmarks
+
+
+class SortedDijkstra(Dijkstra):
+    """Старая версия: минимум очереди через sorted(queue)[0] по объектам Node."""
+
+    def __init__(self, grid: Grid) -> None:
+        super().__init__(grid)
+        # Node читают и пишут общее состояние сетки, им и пользуемся.
+        self.search = grid.search
+
+    def _algorithm(self):
+        start, finish = self.grid.node(self.start), self.grid.node(self.finish)
+        start.g = 0
+        start.h = 0
+        queue = {start}
+        while queue:
+            node = sorted(queue)[0]
+            queue.remove(node)
+            node.is_visited = True
+            self.build_path(node.index)
+            self.visited += 1
+            if finish.is_visited:
+                break
+            for n_node in node.neighbors():
+                if n_node.is_obstacle or n_node.is_visited:
+                    continue
+                queue.add(n_node)
+                new_g = node.g + node.dist(n_node)
+                if new_g < n_node.g:
+                    n_node.g = new_g
+                    n_node.h = self.heuristic(n_node.index)
+                    n_node.parent = node
+                self.explored += 1
+            yield
+        self.path_length = finish.g
+        yield
+
+
+class SortedAStar(SortedDijkstra, AStar):
+    """Старая версия A*."""
+
+
+def measure(algorithm, grid: Grid, repeat=3):
+    """Лучшее время решения из repeat запусков."""
+    best = float('inf')
+    for _ in range(repeat):
+        alg = algorithm(grid)
+        begin = time.perf_counter()
+        alg.solve()
+        best = min(best, time.perf_counter() - begin)
+    return best, alg.statistic
+
+
+def heap_vs_sorted(sides=range(10, 51, 10), seed=0):
+    random.seed(seed)
+    pairs = (SortedDijkstra, Dijkstra), (SortedAStar, AStar)
+    print(f'{"side":>5} {"name":>10} {"sorted, s":>10} {"heap, s":>10} {"speed-up":>9}')
+    for side in sides:
+        maze = MazeGrid(side, side)
+        for old, new in pairs:
+            old_time, old_statistic = measure(old, maze)
+            new_time, new_statistic = measure(new, maze)
+            assert old_statistic['path'] == new_statistic['path']
+            print(f'{side:>5} {new.__name__:>10} {old_time:>10.4f} {new_time:>10.4f} {old_time / new_time:>8.1f}x')
+
+
+def batch_throughput(side=100, queries=400, workers=(1, 2, 4), seed=0):
+    """Запросов в секунду у solve_many на одной карте при разном числе процессов."""
+    random.seed(seed)
+    surface = RandomSurface(side, side)
+    free = [node.pos for node in surface if not node.is_obstacle]
+    pairs = [(random.choice(free), random.choice(free)) for _ in range(queries)]
+    print(f'{"workers":>7} {"queries/s":>10}')
+    for count in workers:
+        begin = time.perf_counter()
+        solve_many(surface, pairs, AStar, workers=count)
+        print(f'{count:>7} {queries / (time.perf_counter() - begin):>10.1f}')
+
+
+def landmark_expansions(side=60, queries=50, count=8, seed=0):
+    """Раскрытые вершины и время AStar с эвристикой ALT и без неё на одних и тех же запросах."""
+    random.seed(seed)
+    print(f'{"grid":>13} {"build, s":>9} {"visited":>8} {"alt":>8} {"time, s":>8} {"alt":>8}')
+    for factory in MazeGrid, RandomSurface:
+        grid = factory(side, side)
+        begin = time.perf_counter()
+        landmarks = Landmarks(grid, count)
+        build = time.perf_counter() - begin
+        free = [node.pos for node in grid if not node.is_obstacle]
+        totals = [0, 0, 0.0, 0.0]
+        for _ in range(queries):
+            grid.start, grid.finish = random.choice(free), random.choice(free)
+            for i, options in enumerate(({}, {'landmarks': landmarks})):
+                alg = AStar(grid, **options)
+                begin = time.perf_counter()
+                alg.solve()
+                totals[2 + i] += time.perf_counter() - begin
+                totals[i] += alg.visited
+        print(f'{factory.__name__:>13} {build:>9.3f} {totals[0]:>8} {totals[1]:>8} {totals[2]:>8.3f} {totals[3]:>8.3f}')
+
+
+def profile(algorithms=(Dijkstra, AStar, JumpPointSearch, BidirectionalAStar, DStarLite), side=50, seed=0):
+    """Куда уходит время поиска: таймеры и счётчики Probe на одном лабиринте."""
+    random.seed(seed)
+    maze = MazeGrid(side, side)
+    print(f'{"name":>20} {"popped":>7} {"relaxed":>8} {"peak":>5} {"expand, s":>10} {"succ, s":>8} {"h, s":>8}')
+    for algorithm in algorithms:
+        alg = algorithm(maze)
+        probe = alg.attach()
+        alg.solve()
+        print(f'{algorithm.__name__:>20} {probe.popped:>7} {probe.relaxed:>8} {probe.peak_frontier:>5} '
+              f'{probe.timers["expand"]:>10.4f} {probe.timers["successors"]:>8.4f} {probe.timers["heuristic"]:>8.4f}')
+
+
+def main():
+    heap_vs_sorted()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,148 +1,89 @@
 import csv
+import os
+import random
+import time
+import tracemalloc
 
 from pathfind.grid import Grid, MazeGrid, RandomSurface
-from pathfind.algorithm import Wave, Dijkstra, AStar
+from pathfind.algorithm import Wave, Dijkstra, AStar, JumpPointSearch, BidirectionalDijkstra, BidirectionalAStar
+from pathfind.hierarchy import Hierarchy
+from pathfind import runner
 
 
-def compare(factory):
-    f = open('results/surface.csv', mode='w', newline='')
+# Имя в csv, класс, опции конструктора.
+ALGORITHMS = [
+    ('a_star', AStar, {}),
+    ('jps', JumpPointSearch, {}),
+    ('bi_a_star', BidirectionalAStar, {}),
+    ('dijkstra', Dijkstra, {}),
+    ('bi_dijkstra', BidirectionalDijkstra, {}),
+    ('wave', Wave, {}),
+    ]
+
+
+def compare(factory, sides=range(10, 51, 10), seeds=range(5), workers=None):
+    return runner.run(factory, sides, seeds, ALGORITHMS, 'surface', workers)
+
+
+def compare_a_star(factory, sides=range(10, 151, 10), seeds=range(5), workers=None):
+    algorithms = [('a_star', AStar, {'boost_h': False}), ('a_star_boosted', AStar, {'boost_h': True})]
+    return runner.run(factory, sides, seeds, algorithms, 'a_star', workers)
+
+
+def compare_scenarios(scen_file, map_file=None, limit=None, workers=None, name=None):
+    """Стандартные задачи Moving AI: compare_scenarios('maps/arena.map.scen'), результат в results/{имя .scen}.csv."""
+    name = name or os.path.basename(scen_file).split('.')[0]
+    return runner.run_scenarios(scen_file, ALGORITHMS, name, map_file, limit, workers)
+
+
+def compare_hierarchy(factory, sides=range(50, 201, 50), cluster=10, queries=20):
+    """HPA* против AStar: подготовка, память абстракции и время одного запроса."""
+    f = open('results/hierarchy.csv', mode='w', newline='')
     writer = csv.DictWriter(
         f,
-        fieldnames=['name', 'side', 'path', 'visited', 'explored']
+        fieldnames=['side', 'preprocess', 'memory_kb', 'hpa_query', 'a_star_query', 'path_ratio']
         )
     writer.writeheader()
-    for side in range(10, 51, 10):
+    for side in sides:
         print(f'== Side {side} == ')
-        wave_statistic = {
-            'name': 'wave',
-            'side': side,
-            'path': [],
-            'visited': [],
-            'explored': []
-            }
-        dijkstra_statistic = {
-            'name': 'dijkstra',
-            'side': side,
-            'path': [],
-            'visited': [],
-            'explored': []
-            }
-        a_star_statistic = {
-            'name': 'a_star',
-            'side': side,
-            'path': [],
-            'visited': [],
-            'explored': []
-            }
-        for _ in range(5):
-            maze = factory(side, side)
-
-            print('Start A*.')
+        maze = factory(side, side)
+        maze.adjacency
+
+        begin = time.perf_counter()
+        hierarchy = Hierarchy(maze, cluster)
+        preprocess = time.perf_counter() - begin
+        # Память меряем отдельной сборкой, tracemalloc сильно тормозит.
+        tracemalloc.start()
+        copy = Hierarchy(maze, cluster)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del copy
+
+        free = [node.pos for node in maze if not node.is_obstacle]
+        hpa_time = a_star_time = 0
+        ratios = []
+        for _ in range(queries):
+            maze.start, maze.finish = random.choice(free), random.choice(free)
+            begin = time.perf_counter()
+            path_length, _ = hierarchy.find_path(maze.start.pos, maze.finish.pos)
+            hpa_time += time.perf_counter() - begin
+
             a_star = AStar(maze)
+            begin = time.perf_counter()
             a_star.solve()
-            print('Solve A*.')
-            print()
-
-            while a_star.path_length == float('inf'):
-                maze = factory(side, side)
-
-                print('Start A*.')
-                a_star = AStar(maze)
-                a_star.solve()
-                print('Solve A*.')
-                print()
-
-            maze.reset()
-            a_star_statistic['path'].append(a_star.path_length)
-            a_star_statistic['visited'].append(a_star.visited)
-            a_star_statistic['explored'].append(a_star.explored)
-
-            print('Start dijkstra.')
-            dijkstra = Dijkstra(maze)
-            dijkstra.solve()
-            dijkstra_statistic['path'].append(dijkstra.path_length)
-            dijkstra_statistic['visited'].append(dijkstra.visited)
-            dijkstra_statistic['explored'].append(dijkstra.explored)
-            maze.reset()
-            print('Solve dijkstra')
-            print()
-
-            print('Start wave.')
-            wave = Wave(maze)
-            wave.solve()
-            wave_statistic['path'].append(wave.path_length)
-            wave_statistic['visited'].append(wave.visited)
-            wave_statistic['explored'].append(wave.explored)
-            maze.reset()
-            print('Solve wave')
-            print()
-
-        for statistic in a_star_statistic, dijkstra_statistic, wave_statistic:
-            statistic['path'] = sum(statistic['path']) / len(statistic['path'])
-            statistic['visited'] = sum(statistic['visited']) / len(statistic['visited'])
-            statistic['explored'] = sum(statistic['explored']) / len(statistic['explored'])
-            writer.writerow(statistic)
-    f.close()
-
+            a_star_time += time.perf_counter() - begin
+            if a_star.path_length not in (0, float('inf')):
+                ratios.append(path_length / a_star.path_length)
 
-def compare_a_star(factory):
-    f = open('results/a_star.csv', mode='w', newline='')
-    writer = csv.DictWriter(
-        f,
-        fieldnames=['name', 'side', 'path', 'visited', 'explored']
-        )
-    writer.writeheader()
-    for side in range(10, 151, 10):
-        print("SIDE^", side)
-        a_star_statistic = {
-            'name': 'a_star',
-            'side': side,
-            'path': [],
-            'visited': [],
-            'explored': []
-            }
-        a_star_boosted_statistic = {
-            'name': 'a_star_boosted',
+        writer.writerow({
             'side': side,
-            'path': [],
-            'visited': [],
-            'explored': []
-            }
-        for _ in range(5):
-            maze = factory(side, side)
-
-            # print('Start A*.')
-            a_star = AStar(maze, False)
-            a_star.solve()
-            # print('Solve A*.')
-            # print()
-
-            while a_star.path_length == float('inf'):
-                maze = factory(side, side)
-                # print('Start A*.')
-                a_star = AStar(maze, False)
-                a_star.solve()
-                # print('Solve A*.')
-                # print()
-            a_star_statistic['path'].append(a_star.path_length)
-            a_star_statistic['visited'].append(a_star.visited)
-            a_star_statistic['explored'].append(a_star.explored)
-            maze.reset()
-
-            # print('Start A*.')
-            a_star = AStar(maze, True)
-            a_star.solve()
-            # print('Solve A*.')
-            # print()
-            a_star_boosted_statistic['path'].append(a_star.path_length)
-            a_star_boosted_statistic['visited'].append(a_star.visited)
-            a_star_boosted_statistic['explored'].append(a_star.explored)
-
-        for statistic in a_star_statistic, a_star_boosted_statistic:
-            statistic['path'] = sum(statistic['path']) / len(statistic['path'])
-            statistic['visited'] = sum(statistic['visited']) / len(statistic['visited'])
-            statistic['explored'] = sum(statistic['explored']) / len(statistic['explored'])
-            writer.writerow(statistic)
+            'preprocess': preprocess,
+            'memory_kb': memory / 1024,
+            'hpa_query': hpa_time / queries,
+            'a_star_query': a_star_time / queries,
+            'path_ratio': sum(ratios) / len(ratios) if ratios else float('nan'),
+            })
+    f.close()
 
 
 def main():
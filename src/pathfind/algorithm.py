@@ -1,7 +1,12 @@
 from collections import deque
+from itertools import count
 import heapq
+import time
 
-from .grid import Node, Grid
+import numpy as np
+
+from .grid import Node, CompactGrid, SearchState
+from .probe import Probe
 from constants import *
 
 
@@ -20,31 +25,106 @@ def contain(array: list[Node], key: Node):
 
 
 class Algorithm:
-    def __init__(self, grid: Grid) -> None:
-        # Сетка - представление местности
+    def __init__(self, grid: CompactGrid, start=None, finish=None, search: SearchState | None = None) -> None:
+        # Сетка - представление местности. Алгоритмы работают с индексами клеток,
+        # поэтому подходит и Grid, и CompactGrid. Карту только читаем.
         self.grid = grid
+        # g, h, parent, visited этого поиска, другие поиски на той же карте их не видят.
+        # Своё состояние берётся из пула сетки при первом обращении и возвращается туда
+        # вместе с алгоритмом. Взятое из пула становится grid.search, его показывают Node сетки.
+        # Переданным search владеет вызывающий.
+        self._search = search
+        self._owns_search = search is None
         self._alg = self._algorithm()
-        self.start = self.grid.start
-        self.finish = self.grid.finish
-        self.path: list[tuple[int, int]] = []
+        # Концы по умолчанию берутся из сетки, явные start и finish (индекс или (x, y)) её не трогают.
+        self.start = grid.start_index if start is None else self._as_index(start)
+        self.finish = grid.finish_index if finish is None else self._as_index(finish)
+        # Путь строится лениво: алгоритм только запоминает узел, до которого его показывать.
+        self._target: int | None = None
+        self._path: list[tuple[int, int]] | None = []
 
         # statistic
         self.visited = 0
         self.explored = 0
         self.path_length = 0
+        # Инструментирование, см. attach.
+        self.probe: Probe | None = None
+
+    def _as_index(self, cell) -> int:
+        return self.grid.index(*cell) if isinstance(cell, tuple) else cell
+
+    @property
+    def search(self) -> SearchState:
+        if self._search is None:
+            self._search = self.grid.acquire_search()
+        return self._search
+
+    @search.setter
+    def search(self, value: SearchState):
+        self._release_search()
+        self._search = value
+        self._owns_search = False
+
+    def _release_search(self):
+        if getattr(self, '_owns_search', False) and self._search is not None:
+            self.grid.release_search(self._search)
+        self._search = None
+
+    def __del__(self):
+        # Законченный поиск не держит себя через генератор, и удаляется сразу, как на него
+        # не осталось ссылок. Брошенный на середине - при сборке циклов.
+        self._release_search()
+
+    def attach(self, probe: Probe | None = None) -> Probe:
+        """Подключает Probe (по умолчанию новый) до начала поиска и возвращает его."""
+        self.probe = probe = probe or Probe()
+        if probe.use_timers:
+            # Подменяем методы только у этого экземпляра, без Probe вызовы идут напрямую.
+            self.successors = probe.timed('successors', self.successors)
+            for name in 'heuristic', 'potential':
+                if hasattr(self, name):
+                    setattr(self, name, probe.timed('heuristic', getattr(self, name)))
+        return probe
 
     def _algorithm(self):
         raise NotImplementedError
 
-    def build_path(self, target: Node):
-        raise NotImplementedError
-    
+    def successors(self, node: int):
+        """Соседи, в которые можно шагнуть из node, и цена шага."""
+        # Препятствия в таблице смежности уже выкинуты.
+        targets, costs, degree = self.grid.adjacency
+        row = 8 * node
+        end = row + degree.item(node)
+        return zip(targets[row:end].tolist(), costs[row:end].tolist())
+
+    def build_path(self, target: int):
+        parent = self.search.parent
+        path = []
+        while target != -1:
+            path.append(target)
+            target = parent.item(target)
+        return [self.grid.pos(index) for index in path]
+
+    @property
+    def path(self) -> list[tuple[int, int]]:
+        # Считаем только при чтении и держим до следующего шага.
+        if self._path is None:
+            self._path = [] if self._target is None else self.build_path(self._target)
+        return self._path
+
+    def colors(self) -> np.ndarray:
+        """Цвета клеток по состоянию этого поиска, см. CompactGrid.colors."""
+        return self.grid.colors(self.search)
+
     def __iter__(self):
-        self.grid.reset()
+        self.search.reset()
         self._alg = self._algorithm()
+        self._target = None
+        self._path = None
         return self
 
     def __next__(self):
+        self._path = None
         return self._alg.__next__()
 
     def solve(self):
@@ -64,147 +144,496 @@ class Algorithm:
 
 class Wave(Algorithm):
     def _algorithm(self):
-        """Это обычный DFS с парой модификаций, ничего сложного"""
+        """Волна фронтами, один шаг - один фронт. Клетка, у которой g уменьшилось, снова идёт
+        в следующий фронт, так что длина пути та же, что у Dijkstra, а не наименьшее число шагов."""
+        search = self.search
+        g, h, parent, visited = search.g_score, search.h_score, search.parent, search.visited
+        stamp, epoch = search.stamp, search.epoch
+        search.touch(self.start)
+        search.touch(self.finish)
+        finish = self.finish
         # Обозначаем стартовый узел
-        self.start.g = 0
-        self.start.h = 0
-        # Очередь
+        g[self.start] = 0
+        h[self.start] = 0
+        h[finish] = 0
+        probe = self.probe
+        # Текущий фронт волны.
         queue = [self.start]
-        # Пока очередь не пуста и конечный узел не посещён.
-        while queue and not self.finish.is_visited:
-            new_queue: list[Node] = []
+        while queue:
+            new_queue: list[int] = []
+            # Клетки следующего фронта, второй раз не добавляем.
+            queued = set()
             for node in queue:
-                node.is_visited = True
-                self.build_path(node)
+                # Дальше финиша идти незачем.
+                if node == finish:
+                    continue
+                visited[node] = True
+                self._target = node
                 self.visited += 1
-                for n_node in node.neighbors():
-                    # Don't explore obstacle.
-                    if n_node.is_obstacle:
-                        continue
-                    # Dont't explore visited.
-                    if n_node.is_visited:
-                        continue
-                    # Don't explore twice.
-                    if n_node not in new_queue:
-                        new_queue.append(n_node)
+                if probe is not None:
+                    probe.pop(node, len(queue))
+                    begin = time.perf_counter()
+                for n_node, cost in self.successors(node):
+                    # Клетку из прошлого поиска сначала сбрасываем.
+                    if stamp[n_node] != epoch:
+                        search.touch(n_node)
+                        h[n_node] = 0
                     # Explore.
-                    new_g = node.g + node.dist(n_node)
-                    n_node.g = min(n_node.g, new_g)
-                    n_node.h = 0
+                    new_g = round(g[node] + cost, 2)
+                    # Путь не короче уже найденного до финиша ничего не улучшит.
+                    if new_g < g[n_node] and new_g < g[finish]:
+                        g[n_node] = new_g
+                        parent[n_node] = node
+                        if n_node not in queued:
+                            queued.add(n_node)
+                            new_queue.append(n_node)
+                        if probe is not None:
+                            probe.relax(n_node, new_g)
+                            if n_node == finish:
+                                probe.improve(n_node, new_g)
                     self.explored += 1
-                    if n_node is self.finish:
-                        queue = [n_node]
-                        break
-                yield
+                if probe is not None:
+                    probe.expanded(begin)
             queue = new_queue
+            yield
 
-        self.build_path(self.finish)
-        self.path_length = self.finish.g
+        if g[finish] != float('inf'):
+            visited[finish] = True
+            self.visited += 1
+        self._target = finish
+        self.path_length = float(g[finish])
         yield
 
-    def build_path(self, target: Node):
-        if target.is_visited:
-            path = [target.pos]
-            while target is not self.start:
-                target = min(target.neighbors())
-                path.append(target.pos)
-        else:
-            path = []
-        self.path = path.copy()
-        return self.path
+    def build_path(self, target: int):
+        if not self.search.visited[target]:
+            return []
+        return super().build_path(target)
 
 
 class Dijkstra(Algorithm):
+    def heuristic(self, node: int):
+        return 0
+
     def _algorithm(self):
+        search = self.search
+        g, h, parent, visited = search.g_score, search.h_score, search.parent, search.visited
+        stamp, epoch = search.stamp, search.epoch
+        search.touch(self.start)
+        search.touch(self.finish)
         # Обозначаем стартовый узел.
-        self.start.g = 0
-        self.start.h = 0
-        queue: set[Node] = {self.start}
+        g[self.start] = 0
+        h[self.start] = 0
+        # Куча с ленивым удалением: устаревшие записи просто пропускаем.
+        # Ключ (f, h, g) - тот же порядок, что у Node.__lt__.
+        counter = count()
+        queue: list[tuple] = [(0, 0, 0, next(counter), self.start)]
+        probe = self.probe
         # Пока очередь существует.
         while queue:
-            # Махинации с конвертацией множества в список
-            node = sorted(queue)[0]
-            queue.remove(node)
+            node = heapq.heappop(queue)[-1]
+            if visited[node]:
+                continue
             # Помечаем узел
-            node.is_visited = True
-            self.build_path(node)
+            visited[node] = True
+            self._target = node
             self.visited += 1
-            if self.finish.is_visited:
+            if probe is not None:
+                probe.pop(node, len(queue) + 1)
+                begin = time.perf_counter()
+            if visited[self.finish]:
                 break
-            
+
             # Обходим соседей
-            for n_node in node.neighbors():
-                # Don't explore obstacle.
-                if n_node.is_obstacle:
-                    continue
+            for n_node, cost in self.successors(node):
+                # Клетку из прошлого поиска сначала сбрасываем.
+                if stamp[n_node] != epoch:
+                    search.touch(n_node)
                 # Dont't explore visited.
-                if n_node.is_visited:
+                elif visited[n_node]:
                     continue
-                queue.add(n_node)
-                new_g = node.g + node.dist(n_node)
-                if new_g < n_node.g:
-                    n_node.g = new_g
-                    n_node.h = 0
-                    n_node.parent = node
+                new_g = round(g[node] + cost, 2)
+                if new_g < g[n_node]:
+                    new_h = round(self.heuristic(n_node), 2)
+                    g[n_node] = new_g
+                    h[n_node] = new_h
+                    parent[n_node] = node
+                    heapq.heappush(queue, (round(new_g + new_h, 2), new_h, new_g, next(counter), n_node))
+                    if probe is not None:
+                        probe.relax(n_node, new_g)
+                        if n_node == self.finish:
+                            probe.improve(n_node, new_g)
                 self.explored += 1
+            if probe is not None:
+                probe.expanded(begin)
             yield
-        self.path_length = self.finish.g
+        self.path_length = float(g[self.finish])
         yield
 
-    def build_path(self, target: Node):
-        path = [target.pos]
-        while target.parent is not None:
-            target = target.parent
-            path.append(target.pos)
-        self.path = path.copy()
-        return self.path
-# 
-
-class AStar(Algorithm):
-    def __init__(self, grid: Grid, boost_h=False) -> None:
-        super().__init__(grid)
+
+class AStar(Dijkstra):
+    def __init__(self, grid: CompactGrid, boost_h=False, landmarks=None, **kwargs) -> None:
+        super().__init__(grid, **kwargs)
         self.boost_h = boost_h
-        
-    def heuristic(self, node: Node):
-        return node.dist(self.finish) ** (1 + 1 * self.boost_h)
+        # landmarks.Landmarks той же карты: к евклидовой оценке добавляется оценка ALT.
+        self.landmarks = landmarks
 
-    def _algorithm(self):
-        self.start.g = 0
-        self.start.h = 0
-        queue: set[Node] = {self.start}
-        while queue:
-            node = sorted(queue)[0]
-            queue.remove(node)
+    def heuristic(self, node: int):
+        h = self.grid.dist(node, self.finish) ** (1 + 1 * self.boost_h)
+        if self.landmarks is not None:
+            h = max(h, self.landmarks.lower_bound(node, self.finish))
+        return h
+
+
+class JumpPointSearch(Dijkstra):
+    """Jump Point Search (Harabor, Grastien) для той же 8-связной сетки, что и Node.neighbors.
+
+    Срезать углы можно, поэтому правила вынужденных соседей те, что без проверки углов.
+    В очередь попадают только точки прыжка, клетки между ними лишь просматриваются.
+    """
+
+    def heuristic(self, node: int):
+        return self.grid.octile(node, self.finish)
+
+    def _walkable(self, x, y):
+        return 0 <= x < self.grid.w and 0 <= y < self.grid.h and not self.grid.obstacles[y * self.grid.w + x]
+
+    def _directions(self, node: int):
+        """Направления, которые остаются после отсечения симметричных путей."""
+        grid = self.grid
+        x, y = grid.pos(node)
+        parent = self.search.parent.item(node)
+        # У старта отсекать нечего.
+        if parent == -1:
+            return [(n_x - x, n_y - y) for n_x, n_y in map(grid.pos, grid.neighbors(node))]
+
+        p_x, p_y = grid.pos(parent)
+        dx, dy = (x > p_x) - (x < p_x), (y > p_y) - (y < p_y)
+        walkable = self._walkable
+        res = []
+        if dx and dy:
+            res += [(0, dy), (dx, 0), (dx, dy)]
+            if not walkable(x - dx, y):
+                res.append((-dx, dy))
+            if not walkable(x, y - dy):
+                res.append((dx, -dy))
+        elif dx:
+            res.append((dx, 0))
+            if not walkable(x, y + 1):
+                res.append((dx, 1))
+            if not walkable(x, y - 1):
+                res.append((dx, -1))
+        else:
+            res.append((0, dy))
+            if not walkable(x + 1, y):
+                res.append((1, dy))
+            if not walkable(x - 1, y):
+                res.append((-1, dy))
+        return res
+
+    def _jump(self, x, y, dx, dy):
+        """Идёт из (x, y) в направлении (dx, dy) до точки прыжка, None если упёрлись."""
+        walkable = self._walkable
+        f_x, f_y = self.grid.pos(self.finish)
+        while True:
+            x, y = x + dx, y + dy
+            if not walkable(x, y):
+                return None
+            if x == f_x and y == f_y:
+                return x, y
+            if dx and dy:
+                if (walkable(x - dx, y + dy) and not walkable(x - dx, y)) or \
+                        (walkable(x + dx, y - dy) and not walkable(x, y - dy)):
+                    return x, y
+                # По диагонали останавливаемся там, откуда есть прыжок по прямой.
+                if self._jump(x, y, dx, 0) or self._jump(x, y, 0, dy):
+                    return x, y
+            elif dx:
+                if (walkable(x + dx, y + 1) and not walkable(x, y + 1)) or \
+                        (walkable(x + dx, y - 1) and not walkable(x, y - 1)):
+                    return x, y
+            else:
+                if (walkable(x + 1, y + dy) and not walkable(x + 1, y)) or \
+                        (walkable(x - 1, y + dy) and not walkable(x - 1, y)):
+                    return x, y
+
+    def successors(self, node: int):
+        grid = self.grid
+        x, y = grid.pos(node)
+        for dx, dy in self._directions(node):
+            jump_point = self._jump(x, y, dx, dy)
+            if jump_point is not None:
+                n_node = grid.index(*jump_point)
+                yield n_node, grid.octile(node, n_node)
+
+    def build_path(self, target: int):
+        # Между точками прыжка идём по прямой или диагонали, восстанавливаем все клетки.
+        grid = self.grid
+        parent = self.search.parent
+        path = [grid.pos(target)]
+        while (target := parent.item(target)) != -1:
+            x, y = path[-1]
+            p_x, p_y = grid.pos(target)
+            dx, dy = (p_x > x) - (p_x < x), (p_y > y) - (p_y < y)
+            while (x, y) != (p_x, p_y):
+                x, y = x + dx, y + dy
+                path.append((x, y))
+        return path
 
-            node.is_visited = True
-            self.build_path(node)
-            self.visited += 1
 
-            if self.finish.is_visited:
+class BidirectionalDijkstra(Algorithm):
+    """Дейкстра одновременно от старта и от финиша, шаги по очереди.
+
+    У каждого направления свои g, parent и closed (словари), в search пишется только то,
+    что нужно для отрисовки. Останавливаемся, когда сумма верхушек очередей не меньше лучшего
+    найденного пути: короче через непросмотренные узлы уже не пройти.
+    """
+
+    def potential(self, node: int):
+        # Потенциал прямого поиска, у обратного он с минусом. У Дейкстры его нет.
+        return 0
+
+    def _algorithm(self):
+        search = self.search
+        g_score, h_score, visited = search.g_score, search.h_score, search.visited
+        stamp, epoch = search.stamp, search.epoch
+        counter = count()
+        # Направление: g, parent, closed, queue, знак потенциала.
+        forward = {self.start: 0}, {self.start: -1}, set(), [(self.potential(self.start), next(counter), self.start)], 1
+        backward = {self.finish: 0}, {self.finish: -1}, set(), [(-self.potential(self.finish), next(counter), self.finish)], -1
+        self._parents = forward[1], backward[1]
+        for node in self.start, self.finish:
+            search.touch(node)
+            g_score[node] = 0
+            h_score[node] = 0
+
+        # Лучший найденный путь и узел, где встретились.
+        best, meet = (0, self.start) if self.start == self.finish else (float('inf'), -1)
+        this, other = forward, backward
+        probe = self.probe
+        while forward[3] and backward[3]:
+            # Путь короче best должен пройти через узлы с ключами не меньше верхушек.
+            # Длины кратны 0.01, так что погрешность float не мешает.
+            if forward[3][0][0] + backward[3][0][0] >= best - 1e-6:
                 break
+            g, parent, closed, queue, sign = this
+            other_g = other[0]
+            node = heapq.heappop(queue)[-1]
+            if node not in closed:
+                closed.add(node)
+                visited[node] = True
+                self._target = node
+                self.visited += 1
+                if probe is not None:
+                    probe.pop(node, len(forward[3]) + len(backward[3]) + 1)
+                    begin = time.perf_counter()
+                for n_node, cost in self.successors(node):
+                    if n_node in closed:
+                        continue
+                    new_g = round(g[node] + cost, 2)
+                    if new_g < g.get(n_node, float('inf')):
+                        g[n_node] = new_g
+                        parent[n_node] = node
+                        heapq.heappush(queue, (new_g + sign * self.potential(n_node), next(counter), n_node))
+                        if probe is not None:
+                            probe.relax(n_node, new_g)
+                        # Для отрисовки: кто первым дошёл до клетки, тот её и красит.
+                        if stamp[n_node] != epoch:
+                            search.touch(n_node)
+                            g_score[n_node] = new_g
+                            h_score[n_node] = 0
+                        # Узел уже достигнут с другой стороны - есть путь.
+                        if n_node in other_g and new_g + other_g[n_node] < best:
+                            best = round(new_g + other_g[n_node], 2)
+                            meet = n_node
+                            if probe is not None:
+                                probe.improve(meet, best)
+                    self.explored += 1
+                if probe is not None:
+                    probe.expanded(begin)
+                yield
+            this, other = other, this
 
-            for n_node in node.neighbors():
-                # Don't explore obstacle.
-                if n_node.is_obstacle:
-                    continue
-                # Dont't explore visited.
-                if n_node.is_visited:
-                    continue
-                queue.add(n_node)
-                new_g = node.g + node.dist(n_node)
-                if new_g < n_node.g:
-                    n_node.g = new_g
-                    n_node.h = self.heuristic(n_node)
-                    n_node.parent = node
-                self.explored += 1
+        if meet != -1:
+            self._target = meet
+        self.path_length = float(best)
+        yield
+
+    def build_path(self, target: int):
+        # Путь от финиша к старту, как у остальных: хвост по обратному поиску, голова по прямому.
+        forward, backward = self._parents
+        head, tail = [], []
+        for parent, chain in (forward, head), (backward, tail):
+            node = target if target in parent else -1
+            while node != -1:
+                chain.append(node)
+                node = parent[node]
+        path = tail[::-1] + head[1:] if tail else head
+        return [self.grid.pos(index) for index in path]
+
+
+class BidirectionalAStar(BidirectionalDijkstra):
+    """Двунаправленный A* с усреднёнными потенциалами (Ikeda и др.).
+
+    p(v) = (h_finish(v) - h_start(v)) / 2 согласован для обоих направлений, поэтому остаётся
+    тот же критерий остановки, что у BidirectionalDijkstra. Эвристика октильная, евклидова
+    с диагональю 1.41 не согласована.
+    """
+
+    def potential(self, node: int):
+        return (self.grid.octile(node, self.finish) - self.grid.octile(self.start, node)) / 2
+
+
+class DStarLite(Algorithm):
+    """D* Lite (Koenig, Likhachev): поиск от финиша к старту, который умеет чинить решение.
+
+    g и rhs живут в словарях и переживают новый проход, в search - только то, что нужно для
+    отрисовки прохода. После правок карты или переноса старта вызовите update_cells - следующий
+    проход перераскроет только затронутые клетки. Перенос финиша сбрасывает всё и считает заново.
+    Концы, не заданные в конструкторе, следуют за сеткой, заданные - остаются своими.
+    """
+
+    def __init__(self, grid: CompactGrid, start=None, finish=None, **kwargs) -> None:
+        super().__init__(grid, start, finish, **kwargs)
+        self._follow_grid = start is None, finish is None
+        self._g: dict[int, float] | None = None
+
+    def heuristic(self, node: int, other: int):
+        return self.grid.octile(node, other)
+
+    def _initialize(self):
+        self._g = {}
+        self._rhs = {self.finish: 0}
+        self._km = 0
+        self._last = self.start
+        self._counter = count()
+        # Куча с ленивым удалением: актуальный ключ узла лежит в _keys.
+        self._queue = []
+        self._keys = {}
+        self._push(self.finish)
+
+    def _key(self, node: int):
+        value = min(self._g.get(node, float('inf')), self._rhs.get(node, float('inf')))
+        return round(value + self.heuristic(self.start, node) + self._km, 2), value
+
+    def _push(self, node: int):
+        key = self._key(node)
+        self._keys[node] = key
+        heapq.heappush(self._queue, (key, next(self._counter), node))
+
+    def _top(self):
+        queue, keys = self._queue, self._keys
+        while queue and keys.get(queue[0][-1]) != queue[0][0]:
+            heapq.heappop(queue)
+        return queue[0][0] if queue else (float('inf'), float('inf'))
+
+    def _neighbors(self, node: int):
+        # Из препятствия и в препятствие шагов нет, таблица смежности второе уже учла.
+        if self.grid.obstacles[node]:
+            return []
+        return self.successors(node)
+
+    def _update_vertex(self, node: int):
+        g, rhs = self._g, self._rhs
+        if node != self.finish:
+            rhs[node] = min(
+                (round(cost + g.get(n_node, float('inf')), 2) for n_node, cost in self._neighbors(node)),
+                default=float('inf'),
+            )
+            self.explored += 1
+            if self.probe is not None:
+                self.probe.relax(node, rhs[node])
+        self._keys.pop(node, None)
+        if g.get(node, float('inf')) != rhs.get(node, float('inf')):
+            self._push(node)
+
+    def update_cells(self, changed=(), start=None, finish=None):
+        """Учитывает правки с прошлого решения: changed - клетки (x, y), у которых сменилось
+        is_obstacle. start и finish - новые концы (индекс или (x, y)); если не заданы, концы,
+        которые следуют за сеткой, берутся из неё, а заданные в конструкторе остаются."""
+        follow_start, follow_finish = self._follow_grid
+        if start is not None:
+            start = self._as_index(start)
+        else:
+            start = self.grid.start_index if follow_start else self.start
+        if finish is not None:
+            finish = self._as_index(finish)
+        else:
+            finish = self.grid.finish_index if follow_finish else self.finish
+        if self._g is not None:
+            if finish != self.finish:
+                self._g = None
+            else:
+                if start != self.start:
+                    self._km = round(self._km + self.heuristic(self._last, start), 2)
+                    self._last = start
+                    self.start = start
+                for pos in changed:
+                    node = self.grid.index(*pos)
+                    self._update_vertex(node)
+                    for n_node in self.grid.neighbors(node):
+                        self._update_vertex(n_node)
+        self.start, self.finish = start, finish
+        # Отрисовка показывает только клетки нового прохода.
+        self.search.reset()
+        self._alg = self._algorithm()
+        self._target = None
+        self._path = None
+
+    def _algorithm(self):
+        if self._g is None:
+            self._initialize()
+        self.visited = 0
+        self.explored = 0
+        search = self.search
+        g_score, h_score, visited = search.g_score, search.h_score, search.visited
+        g, rhs = self._g, self._rhs
+        start = self.start
+        probe = self.probe
+        while self._top() < self._key(start) or rhs.get(start, float('inf')) != g.get(start, float('inf')):
+            old_key = self._top()
+            node = heapq.heappop(self._queue)[-1]
+            del self._keys[node]
+            new_key = self._key(node)
+            if old_key < new_key:
+                self._push(node)
+                continue
+            self.visited += 1
+            if probe is not None:
+                probe.pop(node, len(self._queue) + 1)
+                begin = time.perf_counter()
+            if g.get(node, float('inf')) > rhs[node]:
+                g[node] = rhs[node]
+                update = self._neighbors(node)
+            else:
+                g[node] = float('inf')
+                update = list(self._neighbors(node)) + [(node, 0)]
+            for n_node, _ in update:
+                self._update_vertex(n_node)
+            if probe is not None:
+                probe.expanded(begin)
+                if node == start:
+                    probe.improve(start, g[start])
+            # Для отрисовки.
+            search.touch(node)
+            g_score[node] = g[node]
+            h_score[node] = self.heuristic(start, node)
+            visited[node] = True
             yield
-        self.path_length = self.finish.g
+
+        self._target = start
+        self.path_length = float(g.get(start, float('inf')))
         yield
 
-    def build_path(self, target: Node):
-        path = [target.pos]
-        while target.parent is not None:
-            target = target.parent
-            path.append(target.pos)
-        self.path = path.copy()
-        return self.path
\ No newline at end of file
+    def build_path(self, target: int):
+        # Спуск от старта по g к финишу; путь, как и везде, начинается с финиша.
+        g = self._g
+        if g is None or g.get(target, float('inf')) == float('inf'):
+            return []
+        path = [target]
+        while target != self.finish and len(path) <= self.grid.w * self.grid.h:
+            target = min(
+                self._neighbors(target),
+                key=lambda step: round(step[1] + g.get(step[0], float('inf')), 2),
+            )[0]
+            path.append(target)
+        return [self.grid.pos(index) for index in reversed(path)]
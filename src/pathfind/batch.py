@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .grid import CompactGrid
+from .algorithm import Algorithm, AStar
+
+
+# Сетка процесса-воркера, создаётся один раз в _init_worker.
+_grid: CompactGrid | None = None
+
+
+def _init_worker(w, h, obstacles: bytes):
+    global _grid
+    _grid = CompactGrid(w, h)
+    _grid.obstacles[:] = np.frombuffer(obstacles, dtype=bool)
+
+
+def _solve(query):
+    start, finish, algorithm, options = query
+    # Концы передаём алгоритму, общую сетку воркера не трогаем.
+    alg: Algorithm = algorithm(_grid, start=start, finish=finish, **options)
+    alg.solve()
+    # До недостижимого финиша пути нет, а не путь до последней раскрытой клетки.
+    return alg.statistic, alg.path if alg.path_length != float('inf') else []
+
+
+def solve_many(grid: CompactGrid, pairs, algorithm=AStar, workers=None, **options):
+    """Решает много запросов (start, finish) на одной карте, в том же порядке возвращает (statistic, path).
+    Если финиш недостижим, path пустой.
+
+    Карта уходит в каждый процесс один раз, дальше передаются только пары точек.
+    workers=1 - без процессов, в текущем. options уходят в конструктор алгоритма.
+    """
+    workers = workers or os.cpu_count()
+    initargs = grid.w, grid.h, grid.obstacles.tobytes()
+    queries = [(start, finish, algorithm, options) for start, finish in pairs]
+    if workers == 1:
+        global _grid
+        _init_worker(*initargs)
+        try:
+            return list(map(_solve, queries))
+        finally:
+            # В своём процессе копию карты не держим.
+            _grid = None
+    # Пачками, чтобы не гонять по одной паре на процесс.
+    chunksize = max(1, len(queries) // (workers * 4))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as executor:
+        return list(executor.map(_solve, queries, chunksize=chunksize))
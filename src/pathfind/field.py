@@ -0,0 +1,77 @@
+import heapq
+
+import numpy as np
+
+from .grid import CompactGrid
+
+
+class DistanceField:
+    """Расстояния от каждой клетки до цели и поле направлений (flow) к ней.
+
+    Строится одной Дейкстрой от цели: шаги симметричны, так что это и есть обратный поиск.
+    flow[i] - соседняя клетка на кратчайшем пути от i к цели, -1 если цель недостижима.
+    Годится для любого числа стартов, пока карта не менялась (см. is_valid).
+    """
+
+    def __init__(self, grid: CompactGrid, goal: tuple[int, int] | None = None) -> None:
+        self.grid = grid
+        self.goal = grid.finish_index if goal is None else grid.index(*goal)
+        self.build()
+
+    def build(self):
+        grid = self.grid
+        targets, costs, degree = grid.adjacency
+        # Списки быстрее numpy при поэлементной работе, в массивы переводим в конце.
+        dist = [float('inf')] * (grid.w * grid.h)
+        flow = [-1] * (grid.w * grid.h)
+        dist[self.goal] = 0
+        queue = [(0, self.goal)]
+        while queue:
+            d, node = heapq.heappop(queue)
+            if d > dist[node]:
+                continue
+            row = 8 * node
+            end = row + degree.item(node)
+            for n_node, cost in zip(targets[row:end].tolist(), costs[row:end].tolist()):
+                new_d = round(d + cost, 2)
+                if new_d < dist[n_node]:
+                    dist[n_node] = new_d
+                    flow[n_node] = node
+                    heapq.heappush(queue, (new_d, n_node))
+        self.dist = np.array(dist)
+        self.flow = np.array(flow, dtype=np.int64)
+        self.version = grid.version
+
+    @property
+    def is_valid(self):
+        return self.version == self.grid.version
+
+    def distance(self, pos: tuple[int, int]) -> float:
+        return self.dist.item(self.grid.index(*pos))
+
+    def next_step(self, pos: tuple[int, int]) -> tuple[int, int] | None:
+        index = self.flow.item(self.grid.index(*pos))
+        return None if index == -1 else self.grid.pos(index)
+
+    def path(self, start: tuple[int, int]) -> list[tuple[int, int]]:
+        """Путь от start до цели по полю направлений, пустой если цель недостижима."""
+        index = self.grid.index(*start)
+        if self.dist.item(index) == float('inf'):
+            return []
+        path = [start]
+        while index != self.goal:
+            index = self.flow.item(index)
+            path.append(self.grid.pos(index))
+        return path
+
+    def colors(self) -> np.ndarray:
+        """Тепловая карта (h, w, 3): у цели синий, дальше к красному."""
+        grid = self.grid
+        reachable = np.isfinite(self.dist)
+        scale = self.dist[reachable].max(initial=0) or 1
+        t = np.where(reachable, self.dist, 0) / scale
+        rgb = np.stack((255 * t, np.zeros_like(t), 255 * (1 - t)), axis=-1).astype(int)
+        rgb[~reachable] = (192, 192, 192)
+        rgb[grid.obstacles] = (64, 64, 64)
+        rgb[grid.points] = (255, 0, 0)
+        return rgb.astype(np.uint8).reshape(grid.h, grid.w, 3)
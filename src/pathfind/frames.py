@@ -0,0 +1,221 @@
+"""Запись кадров поиска и потоковая выгрузка анимации в GIF/APNG.
+
+FrameRecorder хранит не каждый кадр целиком, а ключевые кадры и разницу между соседними кадрами.
+GifWriter и ApngWriter пишут кадры в файл по одному, весь ролик в памяти не собирается.
+"""
+import io
+import os
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image
+
+
+class FrameRecorder:
+    """Кадры (цвета клеток (h, w, 3) uint8, путь) в сжатом виде.
+
+    Каждый keyframe-й кадр, а также кадр, где поменялась больше чем max_delta доля клеток
+    (например, сменилась нормировка цвета), хранится целиком. В остальных - индексы изменившихся
+    клеток и их новые цвета.
+    """
+
+    def __init__(self, keyframe=100, max_delta=0.25) -> None:
+        self.keyframe = keyframe
+        self.max_delta = max_delta
+        # ('key', цвета) или ('delta', (индексы, цвета)), путь - массив (n, 2) int32.
+        self._frames: list[tuple[str, object, np.ndarray]] = []
+        self._last: np.ndarray | None = None
+        self._since_key = 0
+
+    def append(self, colors: np.ndarray, path: list[tuple[int, int]]):
+        path = np.array(path, dtype=np.int32).reshape(-1, 2)
+        flat = colors.reshape(-1, 3)
+        if self._last is not None and self._last.shape == flat.shape and self._since_key < self.keyframe:
+            # По каналам через |, any(axis=1) на (n, 3) в разы медленнее.
+            differs = flat != self._last
+            changed = np.flatnonzero(differs[:, 0] | differs[:, 1] | differs[:, 2])
+            if len(changed) <= self.max_delta * len(flat):
+                self._frames.append(('delta', (changed.astype(np.int32), flat[changed]), path))
+                self._last[changed] = flat[changed]
+                self._since_key += 1
+                return
+        self._frames.append(('key', colors.copy(), path))
+        self._last = flat.copy()
+        self._since_key = 0
+
+    def clear(self):
+        self._frames = []
+        self._last = None
+        self._since_key = 0
+
+    def thin(self, step=2):
+        """Оставляет каждый step-й кадр, начиная с первого. Кадры перекладываются в новую запись
+        по одному, распакованным в памяти одновременно бывает только один."""
+        kept = FrameRecorder(self.keyframe, self.max_delta)
+        for i, (colors, path) in enumerate(self):
+            if i % step == 0:
+                kept.append(colors, path)
+        self._frames, self._last, self._since_key = kept._frames, kept._last, kept._since_key
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __iter__(self):
+        """Восстанавливает кадры по порядку: (цвета (h, w, 3), путь [(x, y), ...])."""
+        colors = None
+        for kind, payload, path in self._frames:
+            if kind == 'key':
+                colors = payload.copy()
+            else:
+                changed, values = payload
+                colors.reshape(-1, 3)[changed] = values
+            yield colors.copy(), [tuple(point) for point in path.tolist()]
+
+    @property
+    def nbytes(self):
+        total = 0
+        for kind, payload, path in self._frames:
+            arrays = (payload,) if kind == 'key' else payload
+            total += sum(array.nbytes for array in arrays) + path.nbytes
+        return total
+
+
+def _discard(writer):
+    # Без кадров нет даже заголовка, такой файл не открыть: удаляем его и сообщаем.
+    writer.file.close()
+    os.remove(writer.filename)
+    raise ValueError(f'{writer.filename}: no frames to write')
+
+
+def _exit(writer, exc):
+    # Если выходим по ошибке, а кадров нет - просто убираем файл, ошибку не подменяем.
+    if exc[0] is not None and writer.frames == 0:
+        writer.file.close()
+        os.remove(writer.filename)
+    else:
+        writer.close()
+
+
+class GifWriter:
+    """GIF, который дописывается по кадру: у каждого кадра своя палитра, как при обычном сохранении PIL."""
+
+    def __init__(self, filename: str, duration=150, loop=0) -> None:
+        self.filename = filename
+        self.file = open(filename, mode='wb')
+        self.duration = duration
+        self.loop = loop
+        self.frames = 0
+
+    def _header(self, w, h):
+        self.file.write(b'GIF89a' + struct.pack('<HHBBB', w, h, 0, 0, 0))
+        # NETSCAPE2.0 - число повторов, 0 - бесконечно.
+        self.file.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', self.loop) + b'\x00')
+
+    @staticmethod
+    def _image_block(im: Image.Image):
+        # PIL сохраняет кадр отдельным GIF, из него берём описание изображения и данные,
+        # общую палитру делаем локальной.
+        buffer = io.BytesIO()
+        im.save(buffer, format='GIF')
+        data = buffer.getvalue()
+        packed, pos = data[10], 13
+        table, table_bits = b'', 0
+        if packed & 0x80:
+            table_bits = packed & 7
+            table = data[pos: pos + (3 << (table_bits + 1))]
+            pos += len(table)
+        # Расширения одиночного файла не нужны.
+        while data[pos] == 0x21:
+            pos += 2
+            while data[pos]:
+                pos += data[pos] + 1
+            pos += 1
+        descriptor = bytearray(data[pos: pos + 10])
+        if not descriptor[9] & 0x80:
+            descriptor[9] = (descriptor[9] & 0x40) | 0x80 | table_bits
+            return bytes(descriptor) + table + data[pos + 10: -1]
+        return data[pos: -1]
+
+    def write(self, im: Image.Image):
+        if self.frames == 0:
+            self._header(*im.size)
+        # Graphic Control Extension: кадр не стирается, задержка в сотых секунды.
+        self.file.write(b'\x21\xf9\x04\x04' + struct.pack('<H', self.duration // 10) + b'\x00\x00')
+        self.file.write(self._image_block(im))
+        self.frames += 1
+
+    def close(self):
+        if self.frames == 0:
+            _discard(self)
+        self.file.write(b'\x3b')
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        _exit(self, exc)
+
+
+class ApngWriter:
+    """Анимированный PNG без потерь цвета, дописывается по кадру. Число кадров в заголовке
+    исправляется при close, поэтому файл должен поддерживать seek."""
+
+    def __init__(self, filename: str, duration=150, loop=0) -> None:
+        self.filename = filename
+        self.file = open(filename, mode='wb')
+        self.duration = duration
+        self.loop = loop
+        self.frames = 0
+        self._sequence = 0
+        self._actl = 0
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self.file.write(struct.pack('>I', len(data)) + kind + data)
+        self.file.write(struct.pack('>I', zlib.crc32(kind + data)))
+
+    def _header(self, w, h):
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0))
+        self._actl = self.file.tell()
+        self._chunk(b'acTL', struct.pack('>II', 0, self.loop))
+
+    def write(self, im: Image.Image):
+        pixels = np.asarray(im.convert('RGB'))
+        h, w = pixels.shape[:2]
+        if self.frames == 0:
+            self._header(w, h)
+        self._chunk(b'fcTL', struct.pack(
+            '>IIIIIHHBB', self._sequence, w, h, 0, 0, self.duration, 1000, 0, 0))
+        self._sequence += 1
+        # Фильтр 0 у каждой строки.
+        rows = np.concatenate((np.zeros((h, 1), dtype=np.uint8), pixels.reshape(h, w * 3)), axis=1)
+        data = zlib.compress(rows.tobytes())
+        if self.frames == 0:
+            self._chunk(b'IDAT', data)
+        else:
+            self._chunk(b'fdAT', struct.pack('>I', self._sequence) + data)
+            self._sequence += 1
+        self.frames += 1
+
+    def close(self):
+        if self.frames == 0:
+            _discard(self)
+        self._chunk(b'IEND', b'')
+        self.file.seek(self._actl)
+        self._chunk(b'acTL', struct.pack('>II', self.frames, self.loop))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        _exit(self, exc)
+
+
+def writer_for(filename: str, duration=150, loop=0):
+    """GifWriter или ApngWriter по расширению файла (.gif, .png/.apng)."""
+    if filename.lower().endswith('.gif'):
+        return GifWriter(filename, duration, loop)
+    return ApngWriter(filename, duration, loop)
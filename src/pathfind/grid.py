@@ -1,49 +1,378 @@
+import itertools
 import math
 import random
+import threading
 from typing_extensions import Self
 from functools import total_ordering
 
-from perlin_noise import PerlinNoise
+import numpy as np
+
+from . import maze
+
+
+# Цена диагонального шага между соседями, как её считает dist.
+DIAGONAL = round(math.sqrt(2), 2)
+# Направления на соседей в том же порядке, в каком их отдаёт neighbors().
+DIRECTIONS = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy]
+# Поколения общие для всех SearchState: у разных состояний epoch не совпадает, и кэш ключа
+# Node не примет чужое состояние за своё, когда сетка переключит search.
+_epochs = itertools.count(1)
+
+
+class SearchState:
+    """Состояние одного поиска в плоских numpy массивах: g, h, parent, visited по клеткам.
+
+    Значения клетки действительны, только если её stamp равен epoch, иначе они остались от
+    прошлого поиска и читаются как сброшенные. Массивы на всю карту, поэтому новые состояния
+    не заводят на каждый запрос, а берут из пула сетки (CompactGrid.acquire_search).
+    """
+
+    def __init__(self, size) -> None:
+        self.g_score = np.empty(size)
+        self.h_score = np.empty(size)
+        self.parent = np.empty(size, dtype=np.int64)
+        self.visited = np.zeros(size, dtype=bool)
+        self.stamp = np.zeros(size, dtype=np.int64)
+        self.epoch = next(_epochs)
+        # (max_g, max_h) для Node.color, живут до следующего touch или reset.
+        self._maxima: tuple[float, float] | None = None
+
+    def reset(self):
+        # O(1): новое поколение делает устаревшим всё состояние сразу.
+        self.epoch = next(_epochs)
+        self._maxima = None
+
+    def touch(self, index):
+        """Сбрасывает клетку, если её состояние осталось от прошлого поиска."""
+        if self.stamp[index] != self.epoch:
+            self.stamp[index] = self.epoch
+            self._maxima = None
+            self.g_score[index] = np.inf
+            self.h_score[index] = np.inf
+            self.parent[index] = -1
+            self.visited[index] = False
+
+    def state(self):
+        """Копии g, h, parent, visited, устаревшие клетки уже сброшены."""
+        fresh = self.stamp == self.epoch
+        return (
+            np.where(fresh, self.g_score, np.inf),
+            np.where(fresh, self.h_score, np.inf),
+            np.where(fresh, self.parent, -1),
+            self.visited & fresh,
+        )
+
+    def _maximum(self):
+        # Один проход по массивам на все клетки: Node.color спрашивает максимумы у каждой клетки.
+        # Сеттеры Node кэш сбрасывают; поиск, пишущий массивы напрямую, - только через touch,
+        # так что уменьшение g у уже тронутой клетки масштаб цвета поправит на следующей новой.
+        if self._maxima is None:
+            g, h = self.state()[:2]
+            self._maxima = (
+                max(1, g[np.isfinite(g)].max(initial=0)),
+                max(1, h[np.isfinite(h)].max(initial=0)),
+            )
+        return self._maxima
+
+    @property
+    def max_h(self):
+        return self._maximum()[1]
+
+    @property
+    def max_g(self):
+        return self._maximum()[0]
+
+
+class CompactGrid:
+    """Сетка без объектов Node: карта в плоских numpy массивах, клетка (x, y) имеет индекс y * w + x.
+
+    Алгоритмы только читают карту, своё состояние каждый держит в собственном SearchState,
+    так что на одной карте можно вести несколько поисков сразу, в том числе из разных потоков.
+    Пока они идут, карту (препятствия, старт, финиш) не меняйте. Освободившиеся состояния
+    сетка держит в пуле и отдаёт следующим поискам со сбросом за O(1).
+    """
+
+    def __init__(self, w, h) -> None:
+        self.size = self.w, self.h = w, h
+        # Map.
+        self.obstacles = np.zeros(w * h, dtype=bool)
+        self.points = np.zeros(w * h, dtype=bool)
+        # Общее состояние: его показывают объекты Node и colors() без аргумента. Это состояние
+        # последнего начатого поиска (см. acquire_search), до первого поиска - пустое.
+        self.search = SearchState(w * h)
+        # Свободные состояния поисков.
+        self._spare: list[SearchState] = []
+        # Отпущено ли своим поиском состояние, которое сейчас показывается как search.
+        self._shown_released = True
+        self._lock = threading.Lock()
+
+        self.start_index = 0
+        self.finish_index = w * h - 1
+        self._adjacency = None
+        # Растёт при каждой правке карты, по нему кэши понимают, что устарели.
+        self.version = 0
+
+    def index(self, x, y) -> int:
+        return y * self.w + x
+
+    def pos(self, index) -> tuple[int, int]:
+        y, x = divmod(index, self.w)
+        return x, y
+
+    def neighbors(self, index, cross=False) -> list[int]:
+        w = self.w
+        y, x = divmod(index, w)
+        res = []
+        for n_y in range(max(0, y - 1), min(self.h, y + 2)):
+            for n_x in range(max(0, x - 1), min(w, x + 2)):
+                if cross and n_x != x and n_y != y:
+                    continue
+                if n_x == x and n_y == y:
+                    continue
+                res.append(n_y * w + n_x)
+        return res
+
+    @property
+    def adjacency(self):
+        """Таблица проходимых соседей (targets, costs, degree).
+
+        Соседи клетки i - targets[8 * i: 8 * i + degree[i]], цены шагов в тех же позициях costs.
+        Строится при первом обращении, set_obstacle потом правит только затронутые строки.
+        """
+        if self._adjacency is None:
+            self._adjacency = self._build_adjacency()
+        return self._adjacency
+
+    def _build_adjacency(self):
+        w, h = self.size
+        ys, xs = np.divmod(np.arange(w * h), w)
+        targets = np.full((w * h, 8), -1, dtype=np.int32)
+        costs = np.zeros((w * h, 8), dtype=np.float32)
+        for k, (dx, dy) in enumerate(DIRECTIONS):
+            n_xs, n_ys = xs + dx, ys + dy
+            inside = (0 <= n_xs) & (n_xs < w) & (0 <= n_ys) & (n_ys < h)
+            n_index = np.where(inside, n_ys * w + n_xs, 0)
+            free = inside & ~self.obstacles[n_index]
+            targets[:, k] = np.where(free, n_index, -1)
+            costs[:, k] = np.where(free, DIAGONAL if dx and dy else 1, 0)
+        # Проходимых соседей сдвигаем в начало строки, порядок между ними сохраняем.
+        order = np.argsort(targets == -1, axis=1, kind='stable')
+        targets = np.take_along_axis(targets, order, axis=1)
+        costs = np.take_along_axis(costs, order, axis=1)
+        degree = (targets != -1).sum(axis=1).astype(np.int8)
+        return targets.reshape(-1), costs.reshape(-1), degree
+
+    def _patch_adjacency(self, index):
+        targets, costs, degree = self._adjacency
+        row = 8 * index
+        count = 0
+        for n_index in self.neighbors(index):
+            if not self.obstacles[n_index]:
+                targets[row + count] = n_index
+                costs[row + count] = self.dist(index, n_index)
+                count += 1
+        targets[row + count: row + 8] = -1
+        costs[row + count: row + 8] = 0
+        degree[index] = count
+
+    def set_obstacle(self, index, value):
+        """Меняет клетку карты. Массив obstacles напрямую правьте только до первого поиска."""
+        if self.obstacles[index] == value:
+            return
+        self.obstacles[index] = value
+        self.version += 1
+        if self._adjacency is not None:
+            for n_index in self.neighbors(index):
+                self._patch_adjacency(n_index)
+
+    def components(self) -> np.ndarray:
+        """Метка компоненты связности для каждой клетки (8-связность, как у поиска), -1 у препятствий.
+
+        Без обхода клеток: горизонтальные отрезки свободных клеток склеиваются по рёбрам между
+        соседними строками, метки сходятся подвешиванием к меньшей метке и сжатием путей.
+        """
+        w, h = self.size
+        free = ~self.obstacles.reshape(h, w)
+        if not free.any():
+            return np.full(w * h, -1)
+        # Отрезок начинается там, где слева нет свободной клетки.
+        starts = free.copy()
+        starts[:, 1:] &= ~free[:, :-1]
+        runs = (np.cumsum(starts.reshape(-1)) - 1).reshape(h, w)
+        edges = []
+        for dx in (-1, 0, 1):
+            upper = free[:-1, max(0, -dx): w - max(0, dx)]
+            lower = free[1:, max(0, dx): w - max(0, -dx)]
+            both = upper & lower
+            pairs = np.stack((
+                runs[:-1, max(0, -dx): w - max(0, dx)][both],
+                runs[1:, max(0, dx): w - max(0, -dx)][both],
+            ))
+            # Соседние по строке пары почти всегда те же самые отрезки, повторы выкидываем.
+            repeated = np.zeros(pairs.shape[1], dtype=bool)
+            repeated[1:] = (pairs[:, 1:] == pairs[:, :-1]).all(axis=0)
+            edges.append(pairs[:, ~repeated])
+        a, b = np.concatenate(edges, axis=1)
+        labels = np.arange(int(starts.sum()))
+        while True:
+            low = np.minimum(labels[a], labels[b])
+            np.minimum.at(labels, labels[a], low)
+            np.minimum.at(labels, labels[b], low)
+            while not np.array_equal(labels, labels[labels]):
+                labels = labels[labels]
+            if np.array_equal(labels[a], labels[b]):
+                break
+        return np.where(free, labels[runs], -1).reshape(-1)
+
+    def place_points(self, rng: np.random.Generator, min_dist, connected=False):
+        """Ставит старт и финиш в самую большую компоненту не ближе min_dist друг к другу,
+        если так нельзя - как можно дальше. connected=True - все свободные клетки и так связаны."""
+        if connected:
+            cells = np.flatnonzero(~self.obstacles)
+        else:
+            labels = self.components()
+            cells = np.flatnonzero(labels == np.bincount(labels[labels >= 0]).argmax()) if labels.max() >= 0 else []
+        if len(cells) == 0:
+            return
+        start = cells[rng.integers(len(cells))]
+        ys, xs = np.divmod(cells, self.w)
+        s_y, s_x = divmod(start, self.w)
+        far = np.hypot(xs - s_x, ys - s_y)
+        candidates = cells[far >= min_dist]
+        finish = candidates[rng.integers(len(candidates))] if len(candidates) else cells[far.argmax()]
+        self.start_index, self.finish_index = int(start), int(finish)
+        self.points[[self.start_index, self.finish_index]] = True
+
+    def dist(self, index, other) -> float:
+        return round(math.dist(self.pos(index), self.pos(other)), 2)
+
+    def octile(self, index, other) -> float:
+        """Длина пути по пустой 8-связной сетке, диагональный шаг стоит как у dist соседей."""
+        (x1, y1), (x2, y2) = self.pos(index), self.pos(other)
+        dx, dy = abs(x1 - x2), abs(y1 - y2)
+        return round(DIAGONAL * min(dx, dy) + abs(dx - dy), 2)
+
+    @property
+    def start(self):
+        return self.pos(self.start_index)
+
+    @start.setter
+    def start(self, value: tuple[int, int]):
+        self.start_index = self.index(*value)
+
+    @property
+    def finish(self):
+        return self.pos(self.finish_index)
+
+    @finish.setter
+    def finish(self, value: tuple[int, int]):
+        self.finish_index = self.index(*value)
+
+    def acquire_search(self) -> SearchState:
+        """Сброшенное состояние для нового поиска: из пула, а если он пуст - новое.
+        Оно же становится общим search, так что Node и colors() показывают последний поиск."""
+        with self._lock:
+            if self._shown_released:
+                # Прежний показанный поиск закончен, его состояние можно отдать снова.
+                self._spare.append(self.search)
+            if self._spare:
+                search = self._spare.pop()
+                search.reset()
+            else:
+                search = SearchState(self.w * self.h)
+            self.search, self._shown_released = search, False
+        return search
+
+    def release_search(self, search: SearchState):
+        """Возвращает состояние в пул. Показанное как search остаётся читаемым до следующего
+        acquire_search и в пул уходит тогда."""
+        with self._lock:
+            if search is self.search:
+                self._shown_released = True
+            else:
+                self._spare.append(search)
+
+    def reset(self):
+        """Сбрасывает общее состояние search, поисков со своим состоянием это не касается."""
+        self.search.reset()
+
+    def colors(self, search: SearchState | None = None) -> np.ndarray:
+        """Цвета всех клеток массивом (h, w, 3), те же что у Node.color.
+        search - чьё состояние рисовать, по умолчанию общее (Algorithm.colors даёт своё)."""
+        g, h, _, visited = (search or self.search).state()
+        explored = np.isfinite(g + h)
+        max_h = max(1, h[explored].max(initial=0))
+        max_g = max(1, g[explored].max(initial=0))
+        rgb = np.empty((len(g), 3), dtype=np.uint8)
+        with np.errstate(invalid='ignore'):
+            # Red always max, green depend from h, blue depend from g.
+            for channel, values in enumerate((np.full(len(g), 255.0), 255 * h / max_h, 255 * g / max_g)):
+                values = np.where(explored, values, 0).astype(np.int32)
+                # Explored, but not visited
+                rgb[:, channel] = np.where(visited, values, values * 0.6)
+        rgb[~explored] = (192, 192, 192)
+        rgb[self.obstacles] = (64, 64, 64)
+        rgb[self.points] = (255, 0, 0)
+        return rgb.reshape(self.h, self.w, 3)
+
+    def image(self, search: SearchState | None = None) -> tuple[tuple[tuple[int, int, int]]]:
+        return tuple(tuple(map(tuple, row)) for row in self.colors(search).tolist())
+
+    def __str__(self) -> str:
+        cells = np.where(self.obstacles, '#', ' ')
+        cells[[self.start_index, self.finish_index]] = '@'
+        return '\n'.join(''.join(row) for row in cells.reshape(self.h, self.w))
+
+    @classmethod
+    def load_file(cls, filename: str):
+        """Текстовая карта: '#' - препятствие, '@' - старт, последняя '@' - финиш.
+        Ширина по первой строке. Большие карты лучше хранить в .pfm, см. pathfind.mapfile."""
+        with open(filename) as f:
+            rows = f.read().splitlines()
+        w, h = len(rows[0]), len(rows)
+        text = ''.join(row[:w].ljust(w) for row in rows)
+        cells = np.frombuffer(text.encode('ascii', errors='replace'), dtype=np.uint8)
+        res = cls(w, h)
+        res.obstacles[:] = cells == ord('#')
+        points = np.flatnonzero(cells == ord('@'))
+        if len(points):
+            res.start_index = int(points[0])
+            if len(points) > 1:
+                res.finish_index = int(points[-1])
+            res.points[points] = True
+        return res
 
 
 @total_ordering
 class Node:
-    # Store max values to calculate color
-    max_h = 1
-    max_g = 1
+    """Клетка Grid. Своего состояния не хранит, читает и пишет карту и общее состояние grid.search,
+    то есть состояние последнего начатого на сетке поиска (алгоритма со своим search=... это не касается).
+
+    Для сравнений держит ключ (f, h, g) без округления, его обновляют сеттеры g и h, а при
+    новом поиске (reset сетки) он перечитывается из массивов. Поиски, которые пишут массивы
+    напрямую, узлы не сравнивают.
+    """
+
+    __slots__ = ('pos', 'x', 'y', 'grid', 'index', '_key', '_key_epoch')
 
     def __init__(self, x, y, is_obstacle, grid) -> None:
         self.pos = self.x, self.y = x, y
         self.grid: Grid = grid
-        self.is_point = False
-
+        self.index = grid.index(x, y)
+        self._key = None
+        self._key_epoch = -1
         self.is_obstacle = is_obstacle
-        self.is_visited = False
-        self._g = float('inf')
-        self._h = float('inf')
-        self.parent: None | Node = None
 
     def neighbors(self, cross=False) -> list[Self]:
-        start_y, end_y = max(0, self.y - 1), min(self.grid.h, self.y + 2)
-        start_x, end_x = max(0, self.x - 1), min(self.grid.w, self.x + 2)
-        res = []
-        for row in self.grid._grid[start_y:end_y]:
-            for n_node in row[start_x:end_x]:
-                dx, dy = self.x - n_node.x, self.y - n_node.y
-                if cross and dx * dy:
-                    continue
-                if self is n_node:
-                    continue
-                res.append(n_node)
-        return res
+        return [self.grid.node(index) for index in self.grid.neighbors(self.index, cross)]
 
     def dist(self, other: Self):
         return round(math.dist(self.pos, other.pos), 2)
 
     def reset(self):
         self.is_visited = False
-        self._g = float('inf')
-        self._h = float('inf')
+        self.g = float('inf')
+        self.h = float('inf')
         self.parent = None
 
     @property
@@ -59,9 +388,9 @@ class Node:
         # Red always max, cuz it's pretty.
         r = 255
         # Green depend from h.
-        g = int(255 * self.h / Node.max_h)
+        g = int(255 * self.h / self.grid.search.max_h)
         # Blue depend from g.
-        b = int(255 * self.g / Node.max_g)
+        b = int(255 * self.g / self.grid.search.max_g)
         # Explored, but not visited
         if not self.is_visited:
             color_scale = 0.6
@@ -71,203 +400,213 @@ class Node:
 
         return (r, g, b)
 
+    @property
+    def is_obstacle(self):
+        return bool(self.grid.obstacles[self.index])
+
+    @is_obstacle.setter
+    def is_obstacle(self, value):
+        self.grid.set_obstacle(self.index, value)
+
+    @property
+    def is_point(self):
+        return bool(self.grid.points[self.index])
+
+    @is_point.setter
+    def is_point(self, value):
+        self.grid.points[self.index] = value
+
+    @property
+    def is_fresh(self):
+        # Состояние записано текущим поиском.
+        search = self.grid.search
+        return search.stamp.item(self.index) == search.epoch
+
+    @property
+    def is_visited(self):
+        return self.is_fresh and bool(self.grid.search.visited[self.index])
+
+    @is_visited.setter
+    def is_visited(self, value):
+        self.grid.search.touch(self.index)
+        self.grid.search.visited[self.index] = value
+
+    @property
+    def parent(self) -> None | Self:
+        index = self.grid.search.parent.item(self.index) if self.is_fresh else -1
+        return None if index == -1 else self.grid.node(index)
+
+    @parent.setter
+    def parent(self, value: None | Self):
+        self.grid.search.touch(self.index)
+        self.grid.search.parent[self.index] = -1 if value is None else value.index
+
     @property
     def is_explored(self):
         return self.f != float('inf')
 
     @property
     def f(self):
-        return round(self._h + self._g, 2)
+        # Для показа, сравнения идут по key.
+        return round(self.h + self.g, 2)
 
     @property
     def h(self):
-        return round(self._h, 2)
+        return self.grid.search.h_score.item(self.index) if self.is_fresh else float('inf')
 
     @h.setter
     def h(self, value):
-        if value != float('inf'):
-            Node.max_h = max(Node.max_h, value)
-        self._h = value
+        search, index = self.grid.search, self.index
+        search.touch(index)
+        # Округляем при записи, дальше складываем и сравниваем как есть.
+        value = round(value, 2)
+        search.h_score[index] = value
+        search._maxima = None
+        self._set_key(search.g_score.item(index), value)
 
     @property
     def g(self):
-        return round(self._g, 2)
+        return self.grid.search.g_score.item(self.index) if self.is_fresh else float('inf')
 
     @g.setter
     def g(self, value):
-        if value != float('inf'):
-            Node.max_g = max(Node.max_g, value)
-        self._g = value
+        search, index = self.grid.search, self.index
+        search.touch(index)
+        value = round(value, 2)
+        search.g_score[index] = value
+        search._maxima = None
+        self._set_key(value, search.h_score.item(index))
+
+    def _set_key(self, g, h):
+        self._key = (g + h, h, g)
+        self._key_epoch = self.grid.search.epoch
+
+    @property
+    def key(self):
+        # Ordering key, same one __lt__ uses.
+        if self._key_epoch != self.grid.search.epoch:
+            self._set_key(self.g, self.h)
+        return self._key
 
     def __hash__(self) -> int:
         return hash(self.pos)
 
     def __eq__(self, other):
-        return (self.f, self.h, self.g) == (other.f, other.h, other.g)
+        return self.key == other.key
 
     def __lt__(self, other):
-        return (self.f, self.h, self.g) < (other.f, other.h, other.g)
+        # Hot path of sorted()/heapq on nodes: cached tuples, no properties.
+        if self._key_epoch != self.grid.search.epoch:
+            self._set_key(self.g, self.h)
+        if other._key_epoch != other.grid.search.epoch:
+            other._set_key(other.g, other.h)
+        return self._key < other._key
 
     def __str__(self) -> str:
         return '#' if self.is_obstacle else ' '
 
 
-class Grid:
+class Grid(CompactGrid):
+    """CompactGrid с объектом Node на каждую клетку, удобно для визуализатора."""
+
     def __init__(self, w, h) -> None:
-        self.size = self.w, self.h = w, h
-        self._grid = [[Node(x, y, False, self) for x in range(w)] for y in range(h)]
-        self._start = self._grid[0][0]
-        self._finish = self._grid[h - 1][w - 1]
+        super().__init__(w, h)
+        # Node - только вид на массивы, поэтому создаём их по первому обращению.
+        self._nodes: list[Node | None] = [None] * (w * h)
+
+    def node(self, index) -> Node:
+        node = self._nodes[index]
+        if node is None:
+            y, x = divmod(index, self.w)
+            node = self._nodes[index] = Node(x, y, self.obstacles[index], self)
+        return node
 
     @property
     def start(self):
-        return self._start
+        return self.node(self.start_index)
 
     @start.setter
     def start(self, value: Node | tuple[int, int]):
         if isinstance(value, Node):
-            self._start = value
-        elif isinstance(value, tuple[int, int]):
-            self._start = self._grid[value[1]][value[0]]
+            self.start_index = value.index
+        elif isinstance(value, tuple):
+            self.start_index = self.index(*value)
         else:
             raise TypeError
 
     @property
     def finish(self):
-        return self._finish
+        return self.node(self.finish_index)
 
     @finish.setter
     def finish(self, value: Node | tuple[int, int]):
         if isinstance(value, Node):
-            self._finish = value
-        elif isinstance(value, tuple[int, int]):
-            self._finish = self._grid[value[1]][value[0]]
+            self.finish_index = value.index
+        elif isinstance(value, tuple):
+            self.finish_index = self.index(*value)
         else:
             raise TypeError
 
-    def reset(self):
-        Node.max_g = 1
-        Node.max_h = 1
-        for row in self._grid:
-            for node in row:
-                node.reset()
-
-    def image(self) -> tuple[tuple[tuple[int, int, int]]]:
-        return tuple(tuple(node.color for node in row) for row in self._grid)
-
     def __getitem__(self, key: tuple[int, int]) -> Node:
         x, y = key
-        return self._grid[y][x]
+        if not (0 <= x < self.w and 0 <= y < self.h):
+            raise IndexError(key)
+        return self.node(y * self.w + x)
 
     def __iter__(self):
         for x in range(self.w):
             for y in range(self.h):
                 yield self[x, y]
 
-    def __str__(self) -> str:
-        return '\n'.join(''.join('@' if node is self.start or node is self.finish else str(node) for node in row) for row in self._grid)
-
-
-    @staticmethod
-    def load_file(filename: str):
-        with open(filename) as f:
-            grid = f.readlines()
-            w, h = len(grid[0].strip("\n")), len(grid)
-            print(w, h)
-            res = Grid(w, h)
-            is_second_point = False
-            for y, row in enumerate(grid):
-                for x, cell in enumerate(row.strip("\n")):
-                    node = res[x, y]
-                    if cell == '@':
-                        if is_second_point:
-                            res.finish = node
-                        else:
-                            res.start = node
-                            is_second_point = True
-                        node.is_point = True
-                    elif cell == '#':
-                        node.is_obstacle = True
-        return res
-
 
 class MazeGrid(Grid):
-    def __init__(self, w, h) -> None:
-        super().__init__(w * 2 + 1, h * 2 + 1)
-        for node in self:
-            node.is_obstacle = True
-
-        # Generate maze.
-        x, y = random.randrange(1, self.w, 2), random.randrange(1, self.h, 2)
-        self[x, y].is_obstacle = False
-        track = [self[x, y]]
-        while track:
-            node = track[-1]
-            neighbors = self.maze_neighbors(node, True)
-            if len(neighbors) == 0:
-                track.pop()
-            else:
-                n_node: Node = random.choice(neighbors)
-                n_node.is_obstacle = False
-                self[(node.x + n_node.x) // 2, (node.y + n_node.y) // 2].is_obstacle = False
-                track.append(n_node)
-
-        # Place start and finish.
-        free_nodes: list[Node] = [node for node in self if not node.is_obstacle]
-        self.start = random.choice(free_nodes)
-        self.start.is_point = True
-        self.finish = random.choice(free_nodes)
-        self.finish.is_point = True
-        while self.start.dist(self.finish) < 0.4 * math.hypot(self.h, self.w):
-            self.start.is_point = False
-            self.finish.is_point = False
-            self.start = random.choice(free_nodes)
-            self.finish = random.choice(free_nodes)
-            self.start.is_point = True
-            self.finish.is_point = True
-
-    def maze_neighbors(self, node: Node, is_wall=False):
-        res = []
-        x, y = node.pos
+    """Лабиринт из w x h комнат на сетке (2w + 1) x (2h + 1).
 
-        if y > 1 and (self[x, y - 2].is_obstacle is is_wall):
-            res.append(self[x, y - 2])
+    algorithm - 'backtracker' (по умолчанию, длинные коридоры), 'wilson' (равномерно случайный)
+    или 'eller' (по рядам, самый быстрый на больших картах), см. pathfind.maze.
+    seed=None берёт зерно из random, как RandomSurface.
+    """
 
-        if y < self.h - 2 and (self[x, y + 2].is_obstacle is is_wall):
-            res.append(self[x, y + 2])
+    def __init__(self, w, h, seed=None, algorithm='backtracker') -> None:
+        super().__init__(w * 2 + 1, h * 2 + 1)
+        rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+        self.obstacles[:] = maze.maze(w, h, rng, algorithm).reshape(-1)
+        # Лабиринт - дерево, компоненты искать не нужно.
+        self.place_points(rng, 0.4 * math.hypot(self.h, self.w), connected=True)
+
+
+def perlin(w, h, frequency, rng: np.random.Generator) -> np.ndarray:
+    """Шум Перлина (h, w) сразу для всей сетки, та же формула, что у perlin_noise.PerlinNoise:
+    frequency ячеек решётки на ширину и высоту, градиенты с компонентами из [-1, 1]."""
+    xs = np.arange(w) / w * frequency
+    ys = (np.arange(h) / h * frequency)[:, None]
+    x0, y0 = np.floor(xs).astype(int), np.floor(ys).astype(int)
+    gradients = rng.uniform(-1, 1, (int(frequency) + 2, int(frequency) + 2, 2))
+    fade = lambda t: t * t * t * (t * (t * 6 - 15) + 10)
+    res = np.zeros((h, w))
+    for c_x in (0, 1):
+        for c_y in (0, 1):
+            dx, dy = xs - (x0 + c_x), ys - (y0 + c_y)
+            vector = gradients[y0 + c_y, x0 + c_x]
+            res += fade(1 - abs(dx)) * fade(1 - abs(dy)) * (vector[..., 0] * dx + vector[..., 1] * dy)
+    return res
 
-        if x > 1 and (self[x - 2, y].is_obstacle is is_wall):
-            res.append(self[x - 2, y])
 
-        if x < self.w - 2 and (self[x + 2, y].is_obstacle is is_wall):
-            res.append(self[x + 2, y])
-        return res
+class RandomSurface(Grid):
+    """Местность из шума Перлина: препятствия там, где шум выше threshold.
 
+    seed=None берёт зерно из random, так что random.seed тоже делает карту воспроизводимой.
+    Старт и финиш всегда в одной компоненте связности.
+    """
 
+    threshold = 0.1
 
-class RandomSurface(Grid):
-    def __init__(self, w, h) -> None:
+    def __init__(self, w, h, seed=None) -> None:
         super().__init__(w, h)
-        noise = PerlinNoise(octaves=min(w, h) // 4)
-        for x in range(w):
-            for y in range(h):
-                if self[x, y].is_point:
-                    continue
-                self[x, y].is_obstacle = noise((x / w, y / h)) > 0.1
-
-        # Place start and finish.
-        free_nodes: list[Node] = [node for node in self if not node.is_obstacle]
-        self.start = random.choice(free_nodes)
-        self.start.is_point = True
-        self.finish = random.choice(free_nodes)
-        self.finish.is_point = True
-        while self.start.dist(self.finish) < 0.5 * math.hypot(self.h, self.w):
-            self.start.is_point = False
-            self.finish.is_point = False
-            self.start = random.choice(free_nodes)
-            self.finish = random.choice(free_nodes)
-            self.start.is_point = True
-            self.finish.is_point = True
+        rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+        noise = perlin(w, h, max(1, min(w, h) // 4), rng)
+        self.obstacles[:] = noise.reshape(-1) > self.threshold
+        self.place_points(rng, 0.5 * math.hypot(self.h, self.w))
 
     def num_grid(self):
-        return [[int(self[x, y].is_obstacle) for x in range(self.w)] for y in range(self.h)]
+        return self.obstacles.reshape(self.h, self.w).astype(int).tolist()
@@ -0,0 +1,234 @@
+import heapq
+import math
+from itertools import count
+
+from .grid import CompactGrid
+from .algorithm import AStar
+
+
+class Hierarchy:
+    """HPA* (Botea, Müller, Schaeffer): сетка режется на кластеры cluster x cluster.
+
+    На границах кластеров выбираются переходы, внутри кластера между ними заранее считаются
+    расстояния, не выходящие за кластер. Запрос - поиск по этому абстрактному графу, потом каждый
+    внутрикластерный участок уточняется обычным AStar. Путь почти оптимальный, не строго.
+
+    Переходы группируются по паре компонент связности (внутри своих кластеров) и по непрерывным
+    отрезкам границы, так что ни одна связь между кластерами не теряется, диагональные тоже.
+    """
+
+    # С такой длины отрезка границы кроме середины ставим переходы и на его концах.
+    long_entrance = 6
+
+    def __init__(self, grid: CompactGrid, cluster=10) -> None:
+        self.grid = grid
+        self.cluster = cluster
+        self.cols = math.ceil(grid.w / cluster)
+        self.rows = math.ceil(grid.h / cluster)
+        # Компоненты связности клеток внутри кластера.
+        self._components: dict[int, dict[int, int]] = {}
+        # Переходы (u, v, цена) между парой соседних кластеров (a, b), a < b.
+        self._borders: dict[tuple[int, int], list[tuple[int, int, float]]] = {}
+        # Рёбра абстрактного графа внутри кластера.
+        self._intra: dict[int, dict[int, list[tuple[int, float]]]] = {}
+        self.graph: dict[int, list[tuple[int, float]]] = {}
+        self.build()
+
+    def cluster_of(self, index) -> int:
+        x, y = self.grid.pos(index)
+        return (y // self.cluster) * self.cols + x // self.cluster
+
+    def _bounds(self, cluster_id):
+        c_y, c_x = divmod(cluster_id, self.cols)
+        x0, y0 = c_x * self.cluster, c_y * self.cluster
+        return x0, y0, min(x0 + self.cluster, self.grid.w), min(y0 + self.cluster, self.grid.h)
+
+    def _cells(self, cluster_id):
+        x0, y0, x1, y1 = self._bounds(cluster_id)
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                yield self.grid.index(x, y)
+
+    def _adjacent_clusters(self, cluster_id):
+        c_y, c_x = divmod(cluster_id, self.cols)
+        for n_y in range(max(0, c_y - 1), min(self.rows, c_y + 2)):
+            for n_x in range(max(0, c_x - 1), min(self.cols, c_x + 2)):
+                if (n_x, n_y) != (c_x, c_y):
+                    yield n_y * self.cols + n_x
+
+    def _steps(self, node):
+        targets, costs, degree = self.grid.adjacency
+        if self.grid.obstacles[node]:
+            return []
+        row = 8 * node
+        end = row + degree.item(node)
+        return zip(targets[row:end].tolist(), costs[row:end].tolist())
+
+    def _local_distances(self, source, cluster_id):
+        """Дейкстра от source, не выходящая за кластер."""
+        x0, y0, x1, y1 = self._bounds(cluster_id)
+        w = self.grid.w
+        dist = {source: 0}
+        queue = [(0, source)]
+        while queue:
+            d, node = heapq.heappop(queue)
+            if d > dist[node]:
+                continue
+            for n_node, cost in self._steps(node):
+                y, x = divmod(n_node, w)
+                if not (x0 <= x < x1 and y0 <= y < y1):
+                    continue
+                new_d = round(d + cost, 2)
+                if new_d < dist.get(n_node, float('inf')):
+                    dist[n_node] = new_d
+                    heapq.heappush(queue, (new_d, n_node))
+        return dist
+
+    def _build_components(self, cluster_id):
+        components = {}
+        for cell in self._cells(cluster_id):
+            if cell in components or self.grid.obstacles[cell]:
+                continue
+            for node in self._local_distances(cell, cluster_id):
+                components[node] = cell
+        self._components[cluster_id] = components
+
+    def _build_border(self, a, b):
+        """Переходы между соседними кластерами a < b."""
+        grid = self.grid
+        a_components, b_components = self._components[a], self._components[b]
+        edges = []
+        for u in self._cells(a):
+            for v, cost in self._steps(u):
+                if self.cluster_of(v) == b:
+                    edges.append((u, v, cost))
+        # Группа - пара компонент; внутри неё режем на непрерывные отрезки вдоль границы.
+        groups: dict[tuple[int, int], list] = {}
+        for edge in edges:
+            groups.setdefault((a_components[edge[0]], b_components[edge[1]]), []).append(edge)
+        transitions = []
+        for group in groups.values():
+            group.sort(key=lambda edge: grid.pos(edge[0])[::-1])
+            run = [group[0]]
+            for edge in group[1:] + [None]:
+                if edge is not None and math.dist(grid.pos(edge[0]), grid.pos(run[-1][0])) <= 1.5:
+                    run.append(edge)
+                    continue
+                picked = {len(run) // 2}
+                if len(run) >= self.long_entrance:
+                    picked |= {0, len(run) - 1}
+                transitions += [run[i] for i in sorted(picked)]
+                run = [edge]
+        self._borders[(a, b)] = transitions
+
+    def _build_intra(self, cluster_id):
+        nodes = set()
+        for other in self._adjacent_clusters(cluster_id):
+            for u, v, _ in self._borders.get((min(cluster_id, other), max(cluster_id, other)), []):
+                nodes |= {u, v}
+        nodes = {node for node in nodes if self.cluster_of(node) == cluster_id}
+        intra = {}
+        for node in nodes:
+            dist = self._local_distances(node, cluster_id)
+            intra[node] = [(other, dist[other]) for other in nodes if other != node and other in dist]
+        self._intra[cluster_id] = intra
+
+    def _build_graph(self):
+        graph: dict[int, list[tuple[int, float]]] = {}
+        for intra in self._intra.values():
+            for node, edges in intra.items():
+                graph.setdefault(node, []).extend(edges)
+        for transitions in self._borders.values():
+            for u, v, cost in transitions:
+                graph.setdefault(u, []).append((v, cost))
+                graph.setdefault(v, []).append((u, cost))
+        self.graph = graph
+
+    def build(self):
+        clusters = range(self.cols * self.rows)
+        for cluster_id in clusters:
+            self._build_components(cluster_id)
+        for a in clusters:
+            for b in self._adjacent_clusters(a):
+                if a < b:
+                    self._build_border(a, b)
+        for cluster_id in clusters:
+            self._build_intra(cluster_id)
+        self._build_graph()
+        self.version = self.grid.version
+
+    @property
+    def is_valid(self):
+        return self.version == self.grid.version
+
+    def update_cells(self, changed):
+        """Пересчитывает только кластеры с изменёнными клетками (x, y) и их соседей."""
+        dirty = {self.cluster_of(self.grid.index(*pos)) for pos in changed}
+        affected = set(dirty)
+        for cluster_id in dirty:
+            self._build_components(cluster_id)
+            affected |= set(self._adjacent_clusters(cluster_id))
+        for a in dirty:
+            for b in self._adjacent_clusters(a):
+                self._build_border(min(a, b), max(a, b))
+        for cluster_id in affected:
+            self._build_intra(cluster_id)
+        self._build_graph()
+        self.version = self.grid.version
+
+    def _refine(self, source, target):
+        # Шаг через границу кластеров - просто соседние клетки.
+        if target in dict(self._steps(source)) and self.cluster_of(source) != self.cluster_of(target):
+            return [self.grid.pos(target), self.grid.pos(source)]
+        a_star = AStar(self.grid)
+        a_star.start, a_star.finish = source, target
+        a_star.solve()
+        return a_star.path
+
+    def find_path(self, start: tuple[int, int], finish: tuple[int, int]):
+        """Возвращает (длина, путь), путь от финиша к старту, как Algorithm.path."""
+        grid = self.grid
+        start, finish = grid.index(*start), grid.index(*finish)
+        # Старт и финиш временно подключаем к переходам своих кластеров.
+        extra: dict[int, list[tuple[int, float]]] = {}
+        start_cluster, finish_cluster = self.cluster_of(start), self.cluster_of(finish)
+        from_start = self._local_distances(start, start_cluster)
+        extra[start] = [(node, from_start[node]) for node in self._intra[start_cluster] if node in from_start]
+        if finish in from_start:
+            extra[start].append((finish, from_start[finish]))
+        to_finish = self._local_distances(finish, finish_cluster)
+        for node in self._intra[finish_cluster]:
+            if node in to_finish:
+                extra.setdefault(node, []).append((finish, to_finish[node]))
+
+        # A* по абстрактному графу.
+        counter = count()
+        g = {start: 0}
+        parent = {start: -1}
+        queue = [(grid.octile(start, finish), next(counter), start)]
+        closed = set()
+        while queue:
+            node = heapq.heappop(queue)[-1]
+            if node == finish:
+                break
+            if node in closed:
+                continue
+            closed.add(node)
+            for n_node, cost in self.graph.get(node, []) + extra.get(node, []):
+                new_g = round(g[node] + cost, 2)
+                if new_g < g.get(n_node, float('inf')):
+                    g[n_node] = new_g
+                    parent[n_node] = node
+                    heapq.heappush(queue, (new_g + grid.octile(n_node, finish), next(counter), n_node))
+        if finish not in parent:
+            return float('inf'), []
+
+        abstract = [finish]
+        while parent[abstract[-1]] != -1:
+            abstract.append(parent[abstract[-1]])
+        # Уточнение участков, abstract идёт от финиша к старту.
+        path = [grid.pos(finish)]
+        for target, source in zip(abstract, abstract[1:]):
+            path += self._refine(source, target)[1:]
+        length = round(sum(grid.dist(grid.index(*a), grid.index(*b)) for a, b in zip(path, path[1:])), 2)
+        return length, path
@@ -0,0 +1,86 @@
+import hashlib
+import os
+
+import numpy as np
+
+from .grid import CompactGrid
+from .field import DistanceField
+
+
+class Landmarks:
+    """Эвристика ALT: расстояния от нескольких опорных клеток до всех остальных.
+
+    По неравенству треугольника |d(L, t) - d(L, v)| <= d(v, t) для любого ориентира L, так что
+    максимум по ориентирам - допустимая и согласованная оценка. Стены она видит, в отличие от
+    евклидовой. Таблица (клетки x ориентиры) хранит расстояния в сотых долях в int32, -1 - недостижимо.
+    """
+
+    def __init__(self, grid: CompactGrid, count=8, table=None, landmarks=None) -> None:
+        self.grid = grid
+        self.key = self.map_key(grid)
+        if table is None:
+            if count < 1:
+                raise ValueError(f'count must be at least 1, got {count}')
+            landmarks, table = self._build(count)
+        self.landmarks: list[int] = list(landmarks)
+        self.table: np.ndarray = table
+        # (цель, её строка таблицы) одним кортежем: поиски из разных потоков с разными целями
+        # подменяют его целиком и не видят чужую строку.
+        self._target: tuple[int, list[int]] = (-1, [])
+
+    @staticmethod
+    def map_key(grid: CompactGrid) -> str:
+        data = f'{grid.w}x{grid.h}'.encode() + np.packbits(grid.obstacles).tobytes()
+        return hashlib.sha1(data).hexdigest()
+
+    def _build(self, count):
+        grid = self.grid
+        free = np.flatnonzero(~grid.obstacles)
+        if len(free) == 0:
+            return [], np.full((grid.w * grid.h, 0), -1, dtype=np.int32)
+        # Самый дальний от старта, дальше каждый раз самый дальний от уже выбранных.
+        seed = grid.start_index if not grid.obstacles[grid.start_index] else int(free[0])
+        dist = DistanceField(grid, grid.pos(seed)).dist
+        nearest = np.where(np.isfinite(dist), dist, -1)
+        landmarks, columns = [], []
+        for _ in range(min(count, len(free))):
+            landmark = int(np.argmax(nearest))
+            if landmark in landmarks:
+                break
+            dist = DistanceField(grid, grid.pos(landmark)).dist
+            landmarks.append(landmark)
+            columns.append(np.where(np.isfinite(dist), np.round(dist * 100), -1).astype(np.int32))
+            nearest = np.minimum(nearest, np.where(np.isfinite(dist), dist, np.inf))
+        return landmarks, np.stack(columns, axis=1)
+
+    def lower_bound(self, node: int, target: int) -> float:
+        cached, row = self._target
+        if target != cached:
+            row = self.table[target].tolist()
+            self._target = target, row
+        best = 0
+        for a, b in zip(self.table[node].tolist(), row):
+            if a >= 0 and b >= 0 and abs(a - b) > best:
+                best = abs(a - b)
+        return best / 100
+
+    def save(self, filename: str):
+        np.savez_compressed(filename, key=self.key, landmarks=self.landmarks, table=self.table)
+
+    @classmethod
+    def load(cls, filename: str, grid: CompactGrid):
+        with np.load(filename) as data:
+            if str(data['key']) != cls.map_key(grid):
+                raise ValueError(f'{filename} was built for another map')
+            return cls(grid, table=data['table'], landmarks=data['landmarks'].tolist())
+
+    @classmethod
+    def for_grid(cls, grid: CompactGrid, count=8, directory='results/landmarks'):
+        """Берёт готовую таблицу для этой карты из directory или строит и сохраняет её."""
+        filename = os.path.join(directory, f'{cls.map_key(grid)}_{count}.npz')
+        if os.path.exists(filename):
+            return cls.load(filename, grid)
+        landmarks = cls(grid, count)
+        os.makedirs(directory, exist_ok=True)
+        landmarks.save(filename)
+        return landmarks
@@ -0,0 +1,130 @@
+"""Карты на диске.
+
+Свой двоичный формат .pfm: заголовок и маска препятствий по биту на клетку. Маска читается через
+np.memmap и распаковывается одним проходом numpy, без разбора текста и объектов Node.
+Плюс загрузчики формата Moving AI (https://movingai.com/benchmarks/formats.html): карты .map
+и сценарии .scen.
+"""
+import os
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+from .grid import CompactGrid, Grid
+
+
+MAGIC = b'PFMP'
+VERSION = 1
+# magic, версия, w, h, start, finish.
+HEADER = struct.Struct('<4sIIIQQ')
+# В Moving AI проходимы '.', 'G' и болото 'S', остальное ('@', 'O', 'T', 'W') - препятствия.
+PASSABLE = np.frombuffer(b'.GS', dtype=np.uint8)
+
+
+def save(grid: CompactGrid, filename: str):
+    """Пишет карту в .pfm: старт, финиш и препятствия, состояние поиска не сохраняется."""
+    with open(filename, mode='wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, grid.w, grid.h, grid.start_index, grid.finish_index))
+        f.write(np.packbits(grid.obstacles, bitorder='little').tobytes())
+
+
+def read_mask(filename: str):
+    """(w, h, start, finish, packed) из .pfm, packed - np.memmap на упакованную маску, файл не копируется."""
+    with open(filename, mode='rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f'{filename}: not a map file')
+    magic, version, w, h, start, finish = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f'{filename}: not a map file')
+    if version != VERSION:
+        raise ValueError(f'{filename}: unsupported version {version}')
+    packed = np.memmap(filename, dtype=np.uint8, mode='r', offset=HEADER.size, shape=((w * h + 7) // 8,))
+    return w, h, start, finish, packed
+
+
+def _with_points(grid: CompactGrid, start, finish):
+    grid.start_index, grid.finish_index = int(start), int(finish)
+    grid.points[[grid.start_index, grid.finish_index]] = True
+    return grid
+
+
+def load(filename: str, cls=Grid):
+    """Карта из .pfm. cls - Grid или CompactGrid (без Node, для прогонов)."""
+    w, h, start, finish, packed = read_mask(filename)
+    grid = cls(w, h)
+    grid.obstacles[:] = np.unpackbits(packed, count=w * h, bitorder='little').view(bool)
+    del packed
+    return _with_points(grid, start, finish)
+
+
+def load_movingai(filename: str, cls=Grid):
+    """Карта Moving AI .map. Старт и финиш - первая и последняя свободные клетки,
+    для задач из .scen их выставляет сам прогон."""
+    header = {}
+    with open(filename, mode='rb') as f:
+        for line in f:
+            line = line.strip()
+            if line == b'map':
+                break
+            key, value = line.split(maxsplit=1)
+            header[key.decode()] = value.decode()
+        else:
+            raise ValueError(f'{filename}: no map section')
+        data = f.read()
+    w, h = int(header['width']), int(header['height'])
+    cells = np.frombuffer(data.translate(None, b'\r\n'), dtype=np.uint8)
+    if len(cells) < w * h:
+        raise ValueError(f'{filename}: expected {w}x{h} cells, got {len(cells)}')
+    grid = cls(w, h)
+    grid.obstacles[:] = ~np.isin(cells[:w * h], PASSABLE)
+    free = np.flatnonzero(~grid.obstacles)
+    if len(free):
+        _with_points(grid, free[0], free[-1])
+    return grid
+
+
+def open_map(filename: str, cls=Grid):
+    """Карта по расширению: .pfm, .map (Moving AI) или текстовая с '#' и '@' (Grid.load_file)."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.pfm':
+        return load(filename, cls)
+    if extension == '.map':
+        return load_movingai(filename, cls)
+    return cls.load_file(filename)
+
+
+class Scenario(NamedTuple):
+    """Задача из .scen: карта, старт и финиш (x, y), длина оптимального пути по Moving AI.
+
+    В Moving AI диагональ стоит sqrt(2) и углы препятствий срезать нельзя, поэтому наш путь
+    (диагональ 1.41, углы срезаются) бывает чуть короче optimal.
+    """
+    bucket: int
+    map: str
+    w: int
+    h: int
+    start: tuple[int, int]
+    finish: tuple[int, int]
+    optimal: float
+
+
+def load_scenarios(filename: str) -> list[Scenario]:
+    scenarios = []
+    with open(filename) as f:
+        for line in f:
+            if not line.strip() or line.startswith('version'):
+                continue
+            fields = line.rstrip('\r\n').split('\t') if '\t' in line else line.split()
+            bucket, map_name, w, h, s_x, s_y, f_x, f_y, optimal = fields[:9]
+            scenarios.append(Scenario(
+                int(bucket), map_name, int(w), int(h),
+                (int(s_x), int(s_y)), (int(f_x), int(f_y)), float(optimal),
+                ))
+    return scenarios
+
+
+def scenario_map(scen_file: str, scenario: Scenario):
+    """Путь к карте сценария: имя из .scen ищется рядом с самим .scen."""
+    return os.path.join(os.path.dirname(scen_file), os.path.basename(scenario.map))
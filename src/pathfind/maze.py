@@ -0,0 +1,172 @@
+"""Генераторы лабиринтов без объектов Node.
+
+Лабиринт w x h комнат описывается проходами: right[y, x] - между комнатами (x, y) и (x + 1, y),
+down[y, x] - между (x, y) и (x, y + 1). На карте (2w + 1) x (2h + 1) комната (x, y) - клетка
+(2x + 1, 2y + 1), всё остальное, кроме проходов, стена. Все генераторы строят идеальный лабиринт
+(дерево), rng - numpy.random.Generator.
+"""
+import numpy as np
+
+
+def _passages(right: bytearray, down: bytearray, w, h):
+    # Флаги по комнатам -> right (h, w - 1) и down (h - 1, w).
+    right = np.frombuffer(right, dtype=bool).reshape(h, w)
+    down = np.frombuffer(down, dtype=bool).reshape(h, w)
+    return right[:, :-1], down[:-1]
+
+
+def backtracker(w, h, rng: np.random.Generator):
+    """Поиск в глубину со стеком: длинные извилистые коридоры."""
+    # Проход из комнаты вправо и вниз, плоские bytearray быстрее numpy при поштучной записи.
+    right, down = bytearray(w * h), bytearray(w * h)
+    visited = bytearray(w * h)
+    # Случайные числа берём пачками, по одному из rng слишком медленно.
+    choices = iter(())
+    start = int(rng.integers(w * h))
+    visited[start] = 1
+    track = [start]
+    while track:
+        room = track[-1]
+        x = room % w
+        options = []
+        if room >= w and not visited[room - w]:
+            options.append(room - w)
+        if room < w * (h - 1) and not visited[room + w]:
+            options.append(room + w)
+        if x > 0 and not visited[room - 1]:
+            options.append(room - 1)
+        if x < w - 1 and not visited[room + 1]:
+            options.append(room + 1)
+        if not options:
+            track.pop()
+            continue
+        r = next(choices, None)
+        if r is None:
+            choices = iter(rng.random(1 << 16).tolist())
+            r = next(choices)
+        n_room = options[int(r * len(options))]
+        # Сравниваем с ±w: при w == 1 шаг по вертикали тоже равен ±1.
+        if n_room - room in (w, -w):
+            down[min(room, n_room)] = 1
+        else:
+            right[min(room, n_room)] = 1
+        visited[n_room] = 1
+        track.append(n_room)
+    return _passages(right, down, w, h)
+
+
+def wilson(w, h, rng: np.random.Generator):
+    """Алгоритм Уилсона: случайные блуждания со стиранием петель, лабиринт равномерно случайный.
+
+    Медленный на старте, пока дерево маленькое, для больших карт лучше eller.
+    """
+    right, down = bytearray(w * h), bytearray(w * h)
+    in_tree = bytearray(w * h)
+    in_tree[int(rng.integers(w * h))] = 1
+    # Куда ушли из комнаты в последний раз: повторные заходы сами стирают петли.
+    exits = [0] * (w * h)
+    steps = (-w, w, -1, 1)
+    choices = iter(())
+    for origin in rng.permutation(w * h).tolist():
+        if in_tree[origin]:
+            continue
+        room = origin
+        while not in_tree[room]:
+            y, x = divmod(room, w)
+            while True:
+                r = next(choices, None)
+                if r is None:
+                    choices = iter(rng.integers(4, size=1 << 16).tolist())
+                    r = next(choices)
+                step = steps[r]
+                if (step == -w and y > 0) or (step == w and y < h - 1) or \
+                        (step == -1 and x > 0) or (step == 1 and x < w - 1):
+                    break
+            exits[room] = step
+            room += step
+        room = origin
+        while not in_tree[room]:
+            in_tree[room] = 1
+            n_room = room + exits[room]
+            if exits[room] in (w, -w):
+                down[min(room, n_room)] = 1
+            else:
+                right[min(room, n_room)] = 1
+            room = n_room
+    return _passages(right, down, w, h)
+
+
+def eller(w, h, rng: np.random.Generator):
+    """Алгоритм Эллера: отдаёт ряды (right, down) по одному и помнит только текущий ряд.
+
+    h=None - бесконечный лабиринт, ряды можно писать в файл по мере генерации. У последнего
+    ряда down пустой.
+    """
+    sets = np.arange(w)
+    y = 0
+    while h is None or y < h:
+        last = h is not None and y == h - 1
+        # Множества ряда перенумеровываем в 0..w-1 и склеиваем соседей через union-find.
+        sets = np.unique(sets, return_inverse=True)[1]
+        parent = list(range(w))
+        right = np.zeros(w - 1, dtype=bool)
+        labels = sets.tolist()
+        candidates = range(w - 1) if last else np.flatnonzero(rng.random(w - 1) < 0.5).tolist()
+        for x in candidates:
+            a, b = labels[x], labels[x + 1]
+            while parent[a] != a:
+                a = parent[a]
+            while parent[b] != b:
+                b = parent[b]
+            if a < b:
+                parent[b] = a
+                right[x] = True
+            elif b < a:
+                parent[a] = b
+                right[x] = True
+        roots = np.array(parent)
+        while not np.array_equal(roots, roots[roots]):
+            roots = roots[roots]
+        sets = roots[sets]
+        if last:
+            yield right, np.zeros(w, dtype=bool)
+            return
+
+        # Вниз уходит случайная часть комнат, но от каждого множества хотя бы одна.
+        down = rng.random(w) < 0.5
+        has_down = np.bincount(sets, weights=down, minlength=w) > 0
+        order = rng.permutation(w)
+        labels, first = np.unique(sets[order], return_index=True)
+        lonely = ~has_down[labels]
+        down[order[first[lonely]]] = True
+        yield right, down
+        # Комнаты без прохода сверху начинают свои множества.
+        sets = np.where(down, sets, w + np.arange(w))
+        y += 1
+
+
+def mask_rows(rows, w):
+    """Превращает ряды (right, down) в строки карты шириной 2w + 1, True - стена."""
+    wall = np.ones(2 * w + 1, dtype=bool)
+    yield wall
+    for right, down in rows:
+        rooms = wall.copy()
+        rooms[1::2] = False
+        rooms[2:-1:2] = ~right
+        passages = wall.copy()
+        passages[1::2] = ~down
+        yield rooms
+        yield passages
+
+
+GENERATORS = {'backtracker': backtracker, 'wilson': wilson}
+
+
+def maze(w, h, rng: np.random.Generator, algorithm='backtracker') -> np.ndarray:
+    """Маска стен (2h + 1, 2w + 1) лабиринта из w x h комнат."""
+    if algorithm == 'eller':
+        rows = eller(w, h, rng)
+    else:
+        right, down = GENERATORS[algorithm](w, h, rng)
+        rows = zip(right, np.vstack((down, np.zeros((1, w), dtype=bool))))
+    return np.array(list(mask_rows(rows, w)))
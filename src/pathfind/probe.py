@@ -0,0 +1,78 @@
+import time
+from functools import wraps
+
+
+class Probe:
+    """Инструментирование поиска, подключается через Algorithm.attach.
+
+    События - кортежи (kind, node, value):
+        'pop'     - узел взят из очереди на раскрытие, value - размер фронта (кучи вместе с устаревшими записями);
+        'relax'   - у соседа улучшилось g, value - новое g;
+        'improve' - найден более короткий путь до цели, value - его длина.
+    record=True складывает их в events, callback(kind, node, value) получает их сразу - например,
+    чтобы рисовать по ним. Таймеры копят время раскрытия узлов (вместе с соседями и эвристикой),
+    отдельно генерации соседей и вычисления эвристики; timers=False их не включает.
+
+    Без подключённого Probe алгоритм платит одной проверкой на None на узел и на ребро.
+    """
+
+    def __init__(self, record=True, callback=None, timers=True) -> None:
+        self.record = record
+        self.callback = callback
+        self.use_timers = timers
+        self.events: list[tuple[str, int, float]] = []
+        self.timers = {'expand': 0.0, 'successors': 0.0, 'heuristic': 0.0}
+        self.popped = 0
+        self.relaxed = 0
+        self.improved = 0
+        self.peak_frontier = 0
+
+    def _emit(self, kind, node, value):
+        if self.record:
+            self.events.append((kind, node, value))
+        if self.callback is not None:
+            self.callback(kind, node, value)
+
+    def pop(self, node: int, frontier: int):
+        self.popped += 1
+        if frontier > self.peak_frontier:
+            self.peak_frontier = frontier
+        self._emit('pop', node, frontier)
+
+    def relax(self, node: int, g: float):
+        self.relaxed += 1
+        self._emit('relax', node, g)
+
+    def improve(self, node: int, length: float):
+        self.improved += 1
+        self._emit('improve', node, length)
+
+    def expanded(self, begin: float):
+        """Конец раскрытия узла, begin - time.perf_counter() при его взятии из очереди."""
+        self.timers['expand'] += time.perf_counter() - begin
+
+    def timed(self, name: str, func):
+        """Обёртка, которая копит время func в timers[name]. Ленивый результат сразу раскрывается в список,
+        иначе время генерации соседей ушло бы в цикл раскрытия."""
+        timers = self.timers
+
+        @wraps(func)
+        def wrapper(*args):
+            begin = time.perf_counter()
+            result = func(*args)
+            if not isinstance(result, (int, float)):
+                result = list(result)
+            timers[name] += time.perf_counter() - begin
+            return result
+
+        return wrapper
+
+    @property
+    def statistic(self):
+        return {
+            'popped': self.popped,
+            'relaxed': self.relaxed,
+            'improved': self.improved,
+            'peak_frontier': self.peak_frontier,
+            **self.timers,
+        }
@@ -0,0 +1,204 @@
+import csv
+import json
+import os
+import random
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import mapfile
+from .grid import CompactGrid
+
+
+METRICS = ['path', 'visited', 'explored', 'wall', 'cpu', 'memory_kb']
+
+
+def _map_seed(side, seed):
+    # Одна и та же карта для (side, seed) при любом числе процессов и порядке задач.
+    return seed * 100_003 + side
+
+
+def _measure(grid: CompactGrid, algorithm, options, memory):
+    """Метрики METRICS одного поиска, концы - из сетки или из options (start, finish).
+
+    У каждого поиска своё состояние, сбрасывать сетку между алгоритмами не нужно. В memory_kb
+    входит и оно: массивы SearchState на всю карту, хотя страницы под них выделяются лениво.
+    """
+    alg = algorithm(grid, **options)
+    wall, cpu = time.perf_counter(), time.process_time()
+    alg.solve()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    peak = 0
+    if memory:
+        # Отдельный прогон под tracemalloc, он сильно тормозит.
+        tracemalloc.start()
+        algorithm(grid, **options).solve()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        'path': alg.path_length,
+        'visited': alg.visited,
+        'explored': alg.explored,
+        'wall': wall,
+        'cpu': cpu,
+        'memory_kb': peak / 1024,
+        }
+
+
+def _run(task):
+    """Одна карта (side, seed) и все алгоритмы на ней."""
+    factory, side, seed, algorithms, memory = task
+    random.seed(_map_seed(side, seed))
+    grid: CompactGrid = factory(side, side)
+    # Таблица смежности строится лениво, иначе её время досталось бы первому алгоритму.
+    grid.adjacency
+    rows = []
+    for name, algorithm, options in algorithms:
+        rows.append({'name': name, 'side': side, 'seed': seed, **_measure(grid, algorithm, options, memory)})
+    return rows
+
+
+# Карты сценариев, уже открытые этим процессом.
+_maps: dict[str, CompactGrid] = {}
+
+
+def _run_scenarios(task):
+    """Пачка сценариев на одной карте, все алгоритмы на каждом."""
+    map_file, scenarios, algorithms, memory = task
+    grid = _maps.get(map_file)
+    if grid is None:
+        grid = _maps[map_file] = mapfile.open_map(map_file, CompactGrid)
+        grid.adjacency
+    rows = []
+    for number, scenario in scenarios:
+        # Концы задачи передаём поиску, карта остаётся нетронутой.
+        ends = {'start': grid.index(*scenario.start), 'finish': grid.index(*scenario.finish)}
+        for name, algorithm, options in algorithms:
+            rows.append({
+                'name': name,
+                'bucket': scenario.bucket,
+                'scenario': number,
+                'optimal': scenario.optimal,
+                **_measure(grid, algorithm, {**options, **ends}, memory),
+                })
+    return rows
+
+
+def summarize(rows, key='side'):
+    """mean/median/p95 по прогонам для каждой пары (name, key), key - 'side' или 'bucket' у сценариев.
+
+    Среднее пишется под именем самой метрики, как в старых csv, остальное - с суффиксами.
+    Карты, где путь не найден, в агрегаты не входят, их число - в unsolved.
+    """
+    groups: dict[tuple[str, int], list[dict]] = {}
+    for row in rows:
+        groups.setdefault((row['name'], row[key]), []).append(row)
+    summary = []
+    for (name, value), group in groups.items():
+        solved = [row for row in group if row['path'] != float('inf')]
+        record = {'name': name, key: value, 'runs': len(group), 'unsolved': len(group) - len(solved)}
+        for metric in METRICS:
+            values = np.array([row[metric] for row in solved], dtype=float)
+            if len(values) == 0:
+                values = np.array([np.nan])
+            record[metric] = float(values.mean())
+            record[f'{metric}_median'] = float(np.median(values))
+            record[f'{metric}_p95'] = float(np.percentile(values, 95))
+        summary.append(record)
+    return summary
+
+
+def _json_value(value):
+    # inf и nan нестандартны для JSON, пишем null.
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def _write_csv(filename, rows):
+    with open(filename, mode='w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _map_tasks(function, tasks, workers):
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        results = list(map(function, tasks))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(function, tasks))
+    return [row for result in results for row in result]
+
+
+def _save(directory, name, config, rows, summary):
+    os.makedirs(directory, exist_ok=True)
+    _write_csv(os.path.join(directory, f'{name}.csv'), summary)
+    _write_csv(os.path.join(directory, f'{name}_runs.csv'), rows)
+    with open(os.path.join(directory, f'{name}.json'), mode='w') as f:
+        json.dump({
+            'config': config,
+            'runs': [{key: _json_value(value) for key, value in row.items()} for row in rows],
+            'summary': [{key: _json_value(value) for key, value in row.items()} for row in summary],
+            }, f, indent=1)
+
+
+def _algorithms_config(algorithms):
+    return [[alg_name, algorithm.__name__, options] for alg_name, algorithm, options in algorithms]
+
+
+def run(factory, sides, seeds, algorithms, name, workers=None, memory=True, directory='results'):
+    """Прогоняет algorithms на картах factory(side, side) для всех side и seed.
+
+    algorithms - список (имя, класс, опции конструктора). Карта для (side, seed) генерируется
+    один раз с random.seed, задачи (side, seed) раздаются по процессам, результат не зависит
+    от их числа. Пишет в directory:
+        {name}.csv - агрегаты (mean, median, p95) по (алгоритм, side),
+        {name}_runs.csv - все прогоны,
+        {name}.json - параметры, прогоны и агрегаты вместе.
+    Возвращает агрегаты.
+    """
+    tasks = [(factory, side, seed, algorithms, memory) for side in sides for seed in seeds]
+    rows = _map_tasks(_run, tasks, workers)
+    summary = summarize(rows)
+    config = {
+        'factory': factory.__name__,
+        'sides': list(sides),
+        'seeds': list(seeds),
+        'algorithms': _algorithms_config(algorithms),
+        }
+    _save(directory, name, config, rows, summary)
+    return summary
+
+
+def run_scenarios(scen_file, algorithms, name, map_file=None, limit=None, workers=None, memory=False,
+                  directory='results', chunk=50):
+    """Прогоняет algorithms на задачах Moving AI .scen, агрегаты - по bucket (длине задачи).
+
+    map_file - карта (.map, .pfm или текстовая), по умолчанию файл из сценария рядом со .scen.
+    limit - взять только первые limit задач. Задачи раздаются по процессам пачками по chunk,
+    каждый процесс открывает карту один раз. Файлы пишутся как у run, в прогонах ещё есть
+    optimal - длина пути по Moving AI.
+    """
+    scenarios = mapfile.load_scenarios(scen_file)[:limit]
+    by_map: dict[str, list] = {}
+    for number, scenario in enumerate(scenarios):
+        path = map_file or mapfile.scenario_map(scen_file, scenario)
+        by_map.setdefault(path, []).append((number, scenario))
+    tasks = [
+        (path, items[i: i + chunk], algorithms, memory)
+        for path, items in by_map.items() for i in range(0, len(items), chunk)
+        ]
+    rows = _map_tasks(_run_scenarios, tasks, workers)
+    summary = summarize(rows, key='bucket')
+    config = {
+        'scenarios': scen_file,
+        'maps': list(by_map),
+        'limit': limit,
+        'algorithms': _algorithms_config(algorithms),
+        }
+    _save(directory, name, config, rows, summary)
+    return summary
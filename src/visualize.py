@@ -1,13 +1,19 @@
 from functools import partial
+import sys
+import threading
+import time
 
+import numpy as np
 import pygame
 
-from pathfind.algorithm import Wave, Dijkstra, AStar, Algorithm
+from pathfind.algorithm import (
+    Wave, Dijkstra, AStar, JumpPointSearch, BidirectionalDijkstra, BidirectionalAStar, DStarLite, Algorithm
+)
 from pathfind import grid
+from pathfind.field import DistanceField
 from constants import *
 
 pygame.init()
-font = pygame.font.Font(None, TILE_SIZE // 3)
 
 
 class Action:
@@ -33,24 +39,95 @@ class Action:
         return self.status
 
 
+class Snapshot:
+    """Что нарисовать: цвета клеток, g и h для подписей, путь. done - поиск закончен."""
+
+    def __init__(self, alg: Algorithm, done: bool) -> None:
+        self.alg = alg
+        self.done = done
+        self.colors = alg.colors()
+        self.g, self.h = alg.search.state()[:2]
+        self.path = list(alg.path)
+
+
+class Solver:
+    """Решает в фоновом потоке и раз в interval секунд выкладывает Snapshot, окно не замирает.
+
+    Пока поток работает, сетку и алгоритм правит только он: перед правками карты - cancel().
+    """
+
+    def __init__(self, interval=1 / FPS) -> None:
+        self.interval = interval
+        self.snapshot: Snapshot | None = None
+        self._thread: threading.Thread | None = None
+        self._cancel = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, alg: Algorithm):
+        self.cancel()
+        self.snapshot = None
+        self._cancel.clear()
+        self._thread = threading.Thread(target=self._run, args=(alg,), daemon=True)
+        self._thread.start()
+
+    def _run(self, alg: Algorithm):
+        published = time.perf_counter()
+        while not self._cancel.is_set():
+            try:
+                alg.__next__()
+            except StopIteration:
+                self.snapshot = Snapshot(alg, True)
+                return
+            if time.perf_counter() - published > self.interval:
+                self.snapshot = Snapshot(alg, False)
+                published = time.perf_counter()
+
+    def cancel(self):
+        """Останавливает поток между шагами и ждёт его. Алгоритм можно продолжать дальше."""
+        if self._thread is not None:
+            self._cancel.set()
+            self._thread.join()
+            self._thread = None
+
+
 class Grid(pygame.Surface):
-    def __init__(self, surface: pygame.Surface) -> None:
+    def __init__(self, surface: pygame.Surface, size=GRID_SIZE) -> None:
         super().__init__(SIZE)
         self.surface = surface
 
         # -- visualize --
         self.is_running = True
+        g_w, g_h = size
+        self.tile = min(W // g_w, H // g_h)
+        self.font = pygame.font.Font(None, max(1, self.tile // 3))
+        # Клетки рисуются на отдельной поверхности и перерисовываются, только когда изменились.
+        self.tiles = pygame.Surface((g_w * self.tile, g_h * self.tile))
+        self._colors: np.ndarray | None = None
+        self._details: tuple | None = None
+        # Отрисованные строки чисел для подробностей.
+        self._glyphs: dict[str, pygame.Surface] = {}
 
         # -- PathFind --
-        self.grid = grid.Grid(G_W, G_H)
+        self.grid = grid.Grid(g_w, g_h)
         self.grid.start = self.grid[0, 0]
-        self.grid.finish = self.grid[G_W - 1, G_H - 1]
+        self.grid.finish = self.grid[g_w - 1, g_h - 1]
         self.algorithm = Wave
         self.alg: Algorithm = Wave(self.grid)
+        self.finished = False
+        self.solver = Solver()
         self.play = Action(status=True)
         self.animation = Action()
         self.step = Action(self.next_step, delay=50)
+        # Шагов алгоритма за кадр в режиме анимации.
+        self.steps_per_frame = 1
+        self.faster = Action(self.scale_steps, False, 200, 2)
+        self.slower = Action(self.scale_steps, False, 200, 0.5)
         self.show_details = Action()
+        self.heat_map = Action()
+        self.field: DistanceField | None = None
 
     def event_handler(self):
         for event in pygame.event.get():
@@ -58,7 +135,7 @@ class Grid(pygame.Surface):
                 self.is_running = False
         mouse_buttons = pygame.mouse.get_pressed(num_buttons=3)
         mouse_pos = pygame.mouse.get_pos()
-        m_x, m_y = mouse_pos[0] // TILE_SIZE, mouse_pos[1] // TILE_SIZE
+        m_x, m_y = mouse_pos[0] // self.tile, mouse_pos[1] // self.tile
         keys = pygame.key.get_pressed()
         # So cursed
         if keys[pygame.K_SPACE]:
@@ -69,6 +146,12 @@ class Grid(pygame.Surface):
             self.animation.trigger()
         elif keys[pygame.K_c]:
             self.show_details.trigger()
+        elif keys[pygame.K_h]:
+            self.heat_map.trigger()
+        elif keys[pygame.K_EQUALS]:
+            self.faster.trigger()
+        elif keys[pygame.K_MINUS]:
+            self.slower.trigger()
         elif keys[pygame.K_1]:
             self.algorithm = Wave
             self.reload()
@@ -81,90 +164,192 @@ class Grid(pygame.Surface):
         elif keys[pygame.K_4]:
             self.algorithm = lambda grid: AStar(grid, True)
             self.reload()
+        elif keys[pygame.K_5]:
+            self.algorithm = JumpPointSearch
+            self.reload()
+        elif keys[pygame.K_6]:
+            self.algorithm = BidirectionalDijkstra
+            self.reload()
+        elif keys[pygame.K_7]:
+            self.algorithm = BidirectionalAStar
+            self.reload()
+        elif keys[pygame.K_8]:
+            self.algorithm = DStarLite
+            self.reload()
 
         try:
             node = self.grid[m_x, m_y]
         except IndexError:
             return
+        # Клетки, у которых сменилось is_obstacle. Пересчёт только если карта правда поменялась,
+        # иначе зажатая кнопка перезапускала бы поиск каждый кадр.
+        changed = []
+        edited = False
         if mouse_buttons[0]:
             if keys[pygame.K_LSHIFT]:
-                if not node.is_obstacle and node is not self.grid.finish:
+                if not node.is_obstacle and node is not self.grid.finish and node is not self.grid.start:
+                    self.solver.cancel()
                     self.grid.start.is_point = False
                     node.is_point = True
-                    node.is_obstacle = False
                     self.grid.start = node
+                    edited = True
             else:
-                if not node.is_point:
+                if not node.is_point and not node.is_obstacle:
+                    self.solver.cancel()
                     node.is_obstacle = True
+                    changed.append(node.pos)
         elif mouse_buttons[2]:
             if keys[pygame.K_LSHIFT]:
-                if not node.is_obstacle and node is not self.grid.start:
+                if not node.is_obstacle and node is not self.grid.start and node is not self.grid.finish:
+                    self.solver.cancel()
                     self.grid.finish.is_point = False
                     node.is_point = True
-                    node.is_obstacle = False
                     self.grid.finish = node
+                    edited = True
             else:
-                if not node.is_point:
+                if not node.is_point and node.is_obstacle:
+                    self.solver.cancel()
                     node.is_obstacle = False
-        if any(mouse_buttons):
+                    changed.append(node.pos)
+        if changed or edited:
+            self.replan(changed)
+
+    def replan(self, changed):
+        # Инкрементальный алгоритм чинит старое решение, остальные считают заново.
+        if isinstance(self.alg, DStarLite):
+            self.solver.cancel()
+            self.alg.update_cells(changed)
+            self.finished = False
+            self.step.last_trigger = 0
+        else:
             self.reload()
 
     def reload(self):
-        self.grid.reset()
+        # Старый поиск больше не нужен, его поток останавливаем.
+        self.solver.cancel()
         self.alg = self.algorithm(self.grid)
+        self.finished = False
         self.step.last_trigger = 0
 
+    def scale_steps(self, factor):
+        self.steps_per_frame = max(1, int(self.steps_per_frame * factor))
+
+    def distance_field(self):
+        # Поле пересобираем только после правок карты или переноса финиша.
+        field = self.field
+        if field is None or not field.is_valid or field.goal != self.grid.finish_index:
+            self.field = DistanceField(self.grid)
+        return self.field
+
     def next_step(self):
+        # Шаг в потоке окна, фоновый поиск не должен идти одновременно.
+        self.solver.cancel()
         try:
             self.alg.__next__()
             return True
         except StopIteration:
+            self.finished = True
             return False
 
-    def draw(self):
+    def glyph(self, text: str) -> pygame.Surface:
+        surface = self._glyphs.get(text)
+        if surface is None:
+            surface = self._glyphs[text] = self.font.render(text, True, 'white')
+        return surface
+
+    def draw_tile(self, x, y, color, details=None):
+        tile = self.tile
+        left, top = x * tile, y * tile
+        pygame.draw.rect(self.tiles, color, (left, top, tile, tile))
+        # Линии сетки: сверху тонкая, слева толще. На мелких клетках их не видно, не рисуем.
+        if tile >= 6:
+            pygame.draw.line(self.tiles, (0, 0, 0), (left, top), (left + tile - 1, top))
+            pygame.draw.line(self.tiles, (0, 0, 0), (left, top), (left, top + tile - 1), width=2)
+        if details is not None:
+            g, h, f = details
+            text = self.glyph(h)
+            self.tiles.blit(text, (left + 5, top + 5))
+            text = self.glyph(f)
+            self.tiles.blit(text, (left + tile / 2 - text.get_width() / 2, top + tile / 2 - text.get_height() / 2))
+            text = self.glyph(g)
+            self.tiles.blit(text, (left + tile - 5 - text.get_width(), top + tile - 5 - text.get_height()))
+
+    def draw_tiles(self, colors: np.ndarray, state=None):
+        """Перерисовывает клетки, у которых с прошлого кадра сменился цвет или подписи.
+        state - (g, h) для подписей, по умолчанию берутся из текущего алгоритма."""
+        dirty = np.ones(colors.shape[:2], dtype=bool)
+        if self._colors is not None and self._colors.shape == colors.shape:
+            dirty = (colors != self._colors).any(axis=2)
+        self._colors = colors
+
+        # Подписи только у исследованных клеток и если они влезают.
+        if self.show_details and not self.heat_map and self.tile >= 24:
+            g, h = (values.reshape(colors.shape[:2]) for values in state or self.alg.search.state()[:2])
+            shown = np.isfinite(g + h)
+            if self._details is None:
+                dirty[:] = True
+            else:
+                old_g, old_h, old_shown = self._details
+                dirty |= (shown != old_shown) | (shown & ((g != old_g) | (h != old_h)))
+            self._details = g, h, shown
+        elif self._details is not None:
+            self._details = None
+            dirty[:] = True
+
+        for y, x in np.argwhere(dirty).tolist():
+            text = None
+            if self._details is not None:
+                g, h, shown = self._details
+                if shown[y, x]:
+                    text = str(g[y, x]), str(h[y, x]), str(round(g[y, x] + h[y, x], 2))
+            self.draw_tile(x, y, colors[y, x].tolist(), text)
+
+    def draw(self, snapshot: Snapshot | None = None):
         # Tiles.
-        for node in self.grid:
-            x, y = node.pos
-            x, y = x * TILE_SIZE, y * TILE_SIZE
-            rect = x, y, TILE_SIZE, TILE_SIZE
-            pygame.draw.rect(self, node.color, rect)
-            if self.show_details:
-                text = font.render(str(node.h), True, 'white')
-                self.blit(text, (x + 5, y + 5))
-                text = font.render(str(node.f), True, 'white')
-                self.blit(text, (x + TILE_SIZE / 2 - text.get_width() / 2, y + TILE_SIZE / 2 - text.get_height() / 2))
-                text = font.render(str(node.g), True, 'white')
-                self.blit(text, (x + TILE_SIZE - 5 - text.get_width(), y + TILE_SIZE - 5 - text.get_height()))
-
-        # Grid lines.
-        for y in range(G_H):
-            pygame.draw.line(self, (0, 0, 0), (0, y * TILE_SIZE), (W, y * TILE_SIZE))
-
-        for x in range(G_W):
-            pygame.draw.line(self, (0, 0, 0), (x * TILE_SIZE, 0), (x * TILE_SIZE, H), width=2)
+        state = None
+        if self.heat_map:
+            field = self.distance_field()
+            colors = field.colors()
+            path = field.path(self.grid.start.pos)
+        elif snapshot is not None:
+            colors, state, path = snapshot.colors, (snapshot.g, snapshot.h), snapshot.path
+        elif self.solver.running:
+            # Снимка ещё нет, а алгоритм трогает только поток: оставляем прошлые клетки.
+            colors, path = None, []
+        else:
+            colors = self.alg.colors()
+            path = self.alg.path
+        if colors is not None:
+            self.draw_tiles(colors, state)
+        self.blit(self.tiles, (0, 0))
 
         # Path.
-        if self.alg.path:
-            last_x, last_y = self.alg.path[0]
-            for x, y in self.alg.path:
-                pygame.draw.line(
-                    self,
-                    'black',
-                    (last_x * TILE_SIZE + TILE_SIZE // 2, last_y * TILE_SIZE + TILE_SIZE // 2),
-                    (x * TILE_SIZE + TILE_SIZE // 2, y * TILE_SIZE + TILE_SIZE // 2),
-                    3)
-                last_x, last_y = x, y
-
+        tile = self.tile
+        if len(path) > 1:
+            points = [(x * tile + tile // 2, y * tile + tile // 2) for x, y in path]
+            pygame.draw.lines(self, 'black', False, points, 3 if tile >= 6 else 1)
 
     def update(self):
+        snapshot = None
         if self.animation:
             if self.play:
-                self.step.trigger()
-        else:
-            while self.next_step():
-                pass
+                for _ in range(self.steps_per_frame):
+                    if not self.next_step():
+                        break
+        elif not self.finished:
+            # Поиск идёт в фоне, рисуем последний снимок этого алгоритма. running читаем до
+            # снимка: поток выкладывает последний снимок до того, как завершиться.
+            running = self.solver.running
+            snapshot = self.solver.snapshot
+            if snapshot is not None and snapshot.alg is not self.alg:
+                snapshot = None
+            if snapshot is not None and snapshot.done:
+                self.finished = True
+            elif not running:
+                # Поток не запускали или его остановили на середине.
+                self.solver.start(self.alg)
         self.fill('gray')
-        self.draw()
+        self.draw(snapshot)
         self.surface.blit(self, (0, 0))
 
     def loop(self):
@@ -174,11 +359,14 @@ class Grid(pygame.Surface):
             self.event_handler()
             self.update()
             pygame.display.flip()
+        self.solver.cancel()
         pygame.quit()
 
 
 def main():
-    g = Grid(pygame.display.set_mode(SIZE))
+    # python visualize.py [ширина высота] - размер сетки в клетках.
+    size = tuple(map(int, sys.argv[1:3])) if len(sys.argv) >= 3 else GRID_SIZE
+    g = Grid(pygame.display.set_mode(SIZE), size)
     g.loop()
 
 